@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for serving src.api:app with Uvicorn workers.
+
+Usage: gunicorn -c gunicorn.conf.py src.api:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+timeout = 120
+
+# Import the app (TensorFlow, OpenCV, NumPy, ...) once in the master so the
+# workers share those pages copy-on-write. The model itself is loaded by
+# each worker in the lifespan handler because the TF runtime is not
+# fork-safe; with INFERENCE_BACKEND=tflite the interpreter mmaps the
+# .tflite file, so all workers still share a single page-cache copy of the
+# weights.
+preload_app = True
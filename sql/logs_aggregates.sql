@@ -0,0 +1,62 @@
+-- Server-side aggregates over the `logs` table.
+-- Run once in the Supabase SQL editor (or psql) before deploying the
+-- dashboard/API versions that query them.
+
+-- Per-class totals for the dashboard overview (one row per class). Labels
+-- are folded like logs_hourly_counts so the totals match the trend chart.
+create or replace view logs_agg as
+select initcap(prediction) as prediction, count(*) as c
+from logs
+group by 1;
+
+-- Hourly counts per class for the dashboard trend chart. Both bounds are
+-- optional; called with no arguments it covers the whole table. Labels are
+-- folded to one spelling per class ('FRESH' and 'fresh' count as 'Fresh').
+create or replace function logs_hourly_counts(
+    start_ts timestamptz default null,
+    end_ts timestamptz default null
+)
+returns table (hour timestamptz, prediction text, count bigint)
+language sql stable
+as $$
+    select date_trunc('hour', created_at) as hour, initcap(prediction) as prediction, count(*) as count
+    from logs
+    where (start_ts is null or created_at >= start_ts)
+      and (end_ts is null or created_at < end_ts)
+    group by 1, 2
+    order by 1, 2;
+$$;
+
+-- Per-class counts in an optional [since, until] window, used by
+-- src/reporting/data_fetcher.py for report statistics.
+create or replace function logs_summary(
+    since timestamptz default null,
+    until timestamptz default null
+)
+returns table (prediction text, n bigint)
+language sql stable
+as $$
+    select prediction, count(*) as n
+    from logs
+    where (since is null or created_at >= since)
+      and (until is null or created_at <= until)
+    group by prediction;
+$$;
+
+-- Hourly Fresh/Dry counts since a timestamp, one row per hour, used by
+-- DataFetcher.get_time_series_data.
+create or replace function logs_hourly(since timestamptz)
+returns table (hour timestamptz, fresh_count bigint, dry_count bigint)
+language sql stable
+as $$
+    select date_trunc('hour', created_at) as hour,
+           count(*) filter (where lower(prediction) = 'fresh') as fresh_count,
+           count(*) filter (where lower(prediction) = 'dry') as dry_count
+    from logs
+    where created_at >= since
+    group by 1
+    order by 1;
+$$;
+
+-- Lets the time-window filters above use a range scan.
+create index if not exists logs_created_at_idx on logs (created_at);
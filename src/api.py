@@ -3,21 +3,39 @@
 Exposes an endpoint that accepts images, detects individual date fruits,
 and classifies each as Fresh or Dry using a MobileNet model.
 """
+import asyncio
+import multiprocessing
 import os
 import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import cv2
+# Drop TF's C++ INFO/WARNING output; must be set before TensorFlow is imported
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
 import keras
 import numpy as np
 import tensorflow as tf
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, File, UploadFile
+from fastapi import BackgroundTasks, FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
 from supabase import Client, create_client
-from .preprocessing.detection import detect_and_crop
+from .inference.batcher import MicroBatcher
+from .preprocessing.detection import detect_and_batch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None  # type: ignore
 # LLM ========================================================
 from src.reporting.gemini_reporter import GeminiQCReporter
+from src.reporting.pdf_generator import render_pdf
 from fastapi.middleware.cors import CORSMiddleware
 # ============================================================
 
@@ -25,7 +43,43 @@ load_dotenv()
 
 SRC_DIR = Path(__file__).resolve().parent
 MODEL_PATH = SRC_DIR.parent / 'models' / 'mobilenet_dates.keras'
+TFLITE_MODEL_PATH = SRC_DIR.parent / 'models' / 'mobilenet_dates_int8.tflite'
+ONNX_MODEL_PATH = SRC_DIR.parent / 'models' / 'mobilenet_dates.onnx'
+ONNX_FP16_MODEL_PATH = SRC_DIR.parent / 'models' / 'mobilenet_dates_fp16.onnx'
+REPORTS_DIR = SRC_DIR.parent / 'reports'
+# Finished PDFs and job markers older than this are deleted
+REPORT_TTL_S = float(os.environ.get("REPORT_TTL_S", str(24 * 3600)))
 CLASSES = ['Fresh', 'Dry']
+CLASSES_ARR = np.array(CLASSES, dtype=object)
+
+# "keras" (fp32, default), "tflite" (int8) or "onnx" (ONNX Runtime);
+# see src/training/export.py for producing the converted models
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras").lower()
+
+# ONNX Runtime tries providers in order; keep the GPU ones this build has
+_GPU_PROVIDERS = ["TensorrtExecutionProvider", "CUDAExecutionProvider"]
+ONNX_PROVIDERS = [
+    p for p in _GPU_PROVIDERS if ort is not None and p in ort.get_available_providers()
+] + ["CPUExecutionProvider"]
+
+SERVED_MODEL_PATH = {
+    "tflite": TFLITE_MODEL_PATH,
+    "onnx": ONNX_MODEL_PATH,
+}.get(INFERENCE_BACKEND, MODEL_PATH)
+if SERVED_MODEL_PATH == ONNX_MODEL_PATH and len(ONNX_PROVIDERS) > 1 and ONNX_FP16_MODEL_PATH.exists():
+    # fp16 weights run on tensor cores when a GPU provider is available
+    SERVED_MODEL_PATH = ONNX_FP16_MODEL_PATH
+
+# Optional TFLite delegate library (e.g. "libedgetpu.so.1" for a Coral Edge
+# TPU). Unset, the CPU interpreter already runs float ops via XNNPACK.
+TFLITE_DELEGATE = os.environ.get("TFLITE_DELEGATE")
+
+# Threads per inference call. Each Uvicorn worker runs its own model, so keep
+# this small: WEB_CONCURRENCY * INTRA_OP_THREADS ~= physical cores.
+INTRA_OP_THREADS = int(os.environ.get("INTRA_OP_THREADS", "2"))
+tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+tf.config.threading.set_inter_op_parallelism_threads(1)
+tf.get_logger().setLevel('ERROR')
 
 # LLM ========================================================
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
@@ -46,14 +100,135 @@ supabase: Client = create_client(
     require_env("DB_SERVICE_ROLE_KEY")
 )
 
-app = FastAPI()
 
-try:
-    model = keras.models.load_model(MODEL_PATH)
-    print(f"Model loaded: {MODEL_PATH.name}")
-except (FileNotFoundError, OSError, ValueError) as e:
-    print(f"Failed to load model: {e}")
-    sys.exit(1)
+def load_keras_infer(model_path: Path):
+    """Load the fp32 Keras model and return a batch inference function."""
+    # TF places the model on a GPU automatically if one is visible; grow its
+    # memory on demand instead of reserving the whole card. Done here, not at
+    # import, so a preloading (forking) server never initialises CUDA.
+    for gpu in tf.config.list_physical_devices('GPU'):
+        tf.config.experimental.set_memory_growth(gpu, True)
+    model = keras.models.load_model(model_path)
+
+    @tf.function(input_signature=[tf.TensorSpec([None, 224, 224, 3], tf.float32)])
+    def traced(batch):
+        return model(batch, training=False)
+
+    return lambda batch: traced(batch).numpy()
+
+
+def load_tflite_infer(model_path: Path):
+    """Return a batch inference function backed by the int8 TFLite model."""
+    if not model_path.exists():
+        raise FileNotFoundError(f"TFLite model not found: {model_path}")
+
+    # Interpreters are not thread-safe: each worker thread builds its own
+    local = threading.local()
+
+    def run(batch):
+        interpreter = getattr(local, "interpreter", None)
+        if interpreter is None:
+            delegates = [tf.lite.experimental.load_delegate(TFLITE_DELEGATE)] if TFLITE_DELEGATE else None
+            interpreter = tf.lite.Interpreter(
+                model_path=str(model_path),
+                num_threads=INTRA_OP_THREADS,
+                experimental_delegates=delegates
+            )
+            interpreter.allocate_tensors()
+            local.interpreter = interpreter
+
+        input_detail = interpreter.get_input_details()[0]
+        if tuple(input_detail['shape']) != batch.shape:
+            interpreter.resize_tensor_input(input_detail['index'], batch.shape)
+            interpreter.allocate_tensors()
+        interpreter.set_tensor(input_detail['index'], batch)
+        interpreter.invoke()
+        return interpreter.get_tensor(interpreter.get_output_details()[0]['index'])
+
+    return run
+
+
+def load_onnx_infer(model_path: Path):
+    """Return a batch inference function backed by an ONNX Runtime session."""
+    if ort is None:
+        raise ImportError("onnxruntime is required for the onnx backend. Install it with: pip install onnxruntime")
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = INTRA_OP_THREADS
+    session = ort.InferenceSession(str(model_path), sess_options, providers=ONNX_PROVIDERS)
+    input_name = session.get_inputs()[0].name
+
+    return lambda batch: session.run(None, {input_name: batch})[0]
+
+
+def load_infer():
+    """Load the model for INFERENCE_BACKEND and return its batch inference function."""
+    if INFERENCE_BACKEND == "tflite":
+        return load_tflite_infer(SERVED_MODEL_PATH)
+    if INFERENCE_BACKEND == "onnx":
+        return load_onnx_infer(SERVED_MODEL_PATH)
+    return load_keras_infer(SERVED_MODEL_PATH)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the model once per worker process (after any fork), warm it up,
+    and run the inference pools for the lifetime of the server.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Single worker: serialises model access and keeps TF off the event loop
+    infer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="infer")
+    try:
+        infer = await loop.run_in_executor(infer_pool, load_infer)
+    except (FileNotFoundError, ImportError, OSError, ValueError) as e:
+        infer_pool.shutdown()
+        raise RuntimeError(f"Failed to load model: {e}") from e
+    print(f"Model loaded: {SERVED_MODEL_PATH.name} ({INFERENCE_BACKEND})")
+
+    # Warm up so the first request doesn't pay for tracing / interpreter
+    # allocation (and XLA / cuDNN autotuning on GPU)
+    await loop.run_in_executor(infer_pool, infer, np.zeros((1, 224, 224, 3), dtype=np.float32))
+
+    # Image decode + detection + resize is pure CPU work: run it in separate
+    # processes (no GIL, no blocked event loop). "spawn" keeps the workers
+    # free of this process's TensorFlow runtime and model weights.
+    prep_pool = ProcessPoolExecutor(
+        max_workers=int(os.environ.get("PREP_WORKERS", "2")),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+    # Crops from concurrent uploads share one model call (uint8 in, cast once)
+    batcher = MicroBatcher(
+        lambda crops: infer(crops.astype(np.float32)),
+        infer_pool,
+        max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", "32")),
+        max_delay_ms=float(os.environ.get("BATCH_MAX_DELAY_MS", "5")),
+    )
+    batcher.start()
+
+    # WeasyPrint layout is CPU-bound too; PDFs render off the request path
+    # and clients poll the job instead of waiting on the render
+    pdf_pool = ProcessPoolExecutor(
+        max_workers=int(os.environ.get("PDF_WORKERS", "1")),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+    app.state.infer = infer
+    app.state.batcher = batcher
+    app.state.prep_pool = prep_pool
+    app.state.pdf_pool = pdf_pool
+    yield
+
+    await batcher.stop()
+    prep_pool.shutdown(cancel_futures=True)
+    pdf_pool.shutdown(cancel_futures=True)
+    infer_pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # LLM ========================================================
 
@@ -86,6 +261,84 @@ def generate_report(payload: ReportIn):
     )
     return ReportOut(report_md=report)
 
+
+class PDFJobIn(BaseModel):
+    report_md: str
+
+
+class PDFJobOut(BaseModel):
+    job_id: str
+    status: str  # queued | processing | completed | failed
+    file_url: str | None = None
+
+
+def pdf_job_status(job_id: str) -> PDFJobOut:
+    """
+    Report a render job's progress from its files in REPORTS_DIR.
+
+    Status lives on disk rather than in this process, so any gunicorn worker
+    can answer a poll: <job_id>.queued (written on submit), .part (rendering),
+    .pdf (completed) or .failed (see render_pdf and _mark_job_failed).
+    """
+    # Checked in reverse order of the job's lifecycle; markers briefly overlap
+    for suffix, status in ((".pdf", "completed"), (".failed", "failed"),
+                           (".part", "processing"), (".queued", "queued")):
+        if (REPORTS_DIR / f"{job_id}{suffix}").exists():
+            break
+    else:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+
+    file_url = f"/reports/{job_id}/file" if status == "completed" else None
+    return PDFJobOut(job_id=job_id, status=status, file_url=file_url)
+
+
+def _mark_job_failed(job_id: str, future) -> None:
+    """Record jobs that never ran or whose worker died, which render_pdf cannot."""
+    if future.cancelled() or future.exception() is not None:
+        (REPORTS_DIR / f"{job_id}.failed").touch()
+        (REPORTS_DIR / f"{job_id}.queued").unlink(missing_ok=True)
+
+
+def _expire_reports() -> None:
+    """Delete report PDFs and job markers older than REPORT_TTL_S."""
+    cutoff = time.time() - REPORT_TTL_S
+    for path in REPORTS_DIR.iterdir():
+        try:
+            if path.suffix in (".pdf", ".failed", ".part", ".queued") \
+                    and path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:  # expired concurrently by another worker
+            pass
+
+
+@app.post("/reports/", response_model=PDFJobOut, status_code=202)
+def create_pdf_job(request: Request, payload: PDFJobIn):
+    """Queue a Markdown report for PDF rendering and return its job id."""
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    _expire_reports()
+    job_id = uuid.uuid4().hex
+    (REPORTS_DIR / f"{job_id}.queued").touch()
+    future = request.app.state.pdf_pool.submit(
+        render_pdf, payload.report_md, job_id, str(REPORTS_DIR)
+    )
+    future.add_done_callback(lambda f: _mark_job_failed(job_id, f))
+    return PDFJobOut(job_id=job_id, status="queued")
+
+
+@app.get("/reports/{job_id}", response_model=PDFJobOut)
+def get_pdf_job(job_id: str):
+    """Poll a PDF render job."""
+    return pdf_job_status(job_id)
+
+
+@app.get("/reports/{job_id}/file", response_class=FileResponse)
+def get_pdf_file(job_id: str):
+    """Download the PDF of a completed render job."""
+    if pdf_job_status(job_id).status != "completed":
+        raise HTTPException(status_code=409, detail="Report is not ready")
+    return FileResponse(REPORTS_DIR / f"{job_id}.pdf", media_type="application/pdf",
+                        filename=f"QC_Report_{job_id}.pdf")
+
 # ============================================================
 
 class SinglePrediction(BaseModel):
@@ -103,48 +356,106 @@ class BatchPredictionOut(BaseModel):
     results: list[SinglePrediction]
 
 
-def preprocess_crop(crop):
-    """Resize crop to 224x224 and add batch dimension for model input."""
-    resized = cv2.resize(crop, (224, 224))
-    return tf.expand_dims(resized, 0)
-
-
-def log_prediction(filename: str, label: str, confidence: float):
-    """Insert prediction record into Supabase logs table."""
+def log_predictions(rows: list[dict]):
+    """Insert all prediction records of a request into Supabase in one call."""
     try:
-        supabase.table("logs").insert({
-            "filename": filename,
-            "prediction": label,
-            "confidence": confidence
-        }).execute()
+        supabase.table("logs").insert(rows).execute()
     except (OSError, ValueError) as e:
         print(f"DB log failed: {e}")
 
 
-@app.post("/upload_and_predict/", response_model=BatchPredictionOut)
-async def upload_and_predict(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Detect date fruits in uploaded image and classify each one."""
-    image_bytes = await file.read()
-    crops = detect_and_crop(image_bytes)
+async def read_upload(file: UploadFile) -> bytearray:
+    """Read an uploaded file into a single buffer sized from its Content-Length."""
+    if file.size is None:
+        return bytearray(await file.read())
+    buf = bytearray(file.size)
+    # readinto fills buf straight from the spooled file: no intermediate bytes
+    read = await run_in_threadpool(file.file.readinto, buf)
+    del buf[read:]
+    return buf
+
+
+class MultiImagePredictionOut(BaseModel):
+    """Response containing one BatchPredictionOut per uploaded image, in upload order."""
+
+    images: list[BatchPredictionOut]
+
+
+async def predict_upload(state, file: UploadFile) -> tuple[dict, list[dict]]:
+    """
+    Detect and classify the dates in one uploaded image.
+
+    Returns:
+        tuple: (BatchPredictionOut-shaped dict, log rows for Supabase)
+    """
+    image_bytes = await read_upload(file)
+    loop = asyncio.get_running_loop()
+    crops = await loop.run_in_executor(state.prep_pool, detect_and_batch, image_bytes)
 
     filename = file.filename or "upload"
 
-    predictions = []
-    for i, crop in enumerate(crops):
-        preds = model.predict(preprocess_crop(crop), verbose=0)
-        label = CLASSES[np.argmax(preds[0])]
-        confidence = float(100 * np.max(preds[0]))
-        predictions.append(SinglePrediction(predicted_class=label, confidence=confidence))
-        background_tasks.add_task(log_prediction, f"{filename}_{i}", label, confidence)
-
-    return BatchPredictionOut(
-        filename=filename,
-        total_dates_found=len(crops),
-        results=predictions
+    results, rows = [], []
+    if len(crops):
+        # The model head already applies softmax
+        scores = await state.batcher.submit(crops)
+        idx = scores.argmax(axis=1)
+        # Gather the winning score instead of a second max() reduction;
+        # convert to Python floats in one pass rather than per crop
+        confidences = (scores[np.arange(len(idx)), idx] * 100).tolist()
+        labels = CLASSES_ARR.take(idx).tolist()
+
+        results = [
+            {"predicted_class": label, "confidence": confidence}
+            for label, confidence in zip(labels, confidences)
+        ]
+        rows = [
+            {"filename": f"{filename}_{i}", "prediction": label, "confidence": confidence}
+            for i, (label, confidence) in enumerate(zip(labels, confidences))
+        ]
+
+    return {
+        "filename": filename,
+        "total_dates_found": len(crops),
+        "results": results
+    }, rows
+
+
+# The response models document the responses; bodies are serialised directly
+# with orjson instead of being re-validated through Pydantic on every request.
+@app.post(
+    "/upload_and_predict/",
+    response_class=ORJSONResponse,
+    responses={200: {"model": BatchPredictionOut}},
+)
+async def upload_and_predict(request: Request, background_tasks: BackgroundTasks,
+                             file: UploadFile = File(...)):
+    """Detect date fruits in uploaded image and classify each one."""
+    result, rows = await predict_upload(request.app.state, file)
+    if rows:
+        background_tasks.add_task(log_predictions, rows)
+    return ORJSONResponse(result)
+
+
+@app.post(
+    "/upload_and_predict_batch/",
+    response_class=ORJSONResponse,
+    responses={200: {"model": MultiImagePredictionOut}},
+)
+async def upload_and_predict_batch(request: Request, background_tasks: BackgroundTasks,
+                                   files: list[UploadFile] = File(...)):
+    """Detect and classify date fruits in several uploaded images at once."""
+    # Images are preprocessed in parallel and their crops share model calls
+    # through the micro-batcher
+    outcomes = await asyncio.gather(
+        *(predict_upload(request.app.state, file) for file in files)
     )
+    rows = [row for _, image_rows in outcomes for row in image_rows]
+    if rows:
+        background_tasks.add_task(log_predictions, rows)
+    return ORJSONResponse({"images": [result for result, _ in outcomes]})
 
 
 @app.get('/')
 def health_check():
     """Return service status and loaded model name."""
-    return {'status': 'healthy', 'model': MODEL_PATH.name}
+    return {'status': 'healthy', 'model': SERVED_MODEL_PATH.name}
@@ -3,17 +3,25 @@ Smart Harvest Quality Control Dashboard
 Modern management interface for real-time quality monitoring and reporting.
 """
 
+import html
+import math
 import os
 import sys
+from collections import Counter
 from datetime import datetime, timedelta
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import requests
 from io import BytesIO
+from pathlib import Path
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+except ImportError:
+    psycopg = None
 
 # Import our custom modules
 from reporting.data_fetcher import DataFetcher
@@ -23,6 +31,175 @@ from reporting.pdf_generator import PDFGenerator
 load_dotenv()
 DB_URL = os.environ.get("DB_API")
 DB_KEY = os.environ.get("DB_SERVICE_ROLE_KEY")
+DB_POSTGRES_URL = os.environ.get("DB_POSTGRES_URL")
+GEMINI_KEY = os.environ.get("GEMINI_API_KEY")
+API_URL = os.environ.get("API_URL", "https://csqa-cnn-api.onrender.com")
+# Bundled with the app so the sidebar never waits on an external image host
+LOGO_PATH = Path(__file__).parent / "assets" / "logo.png"
+
+# Custom CSS for modern dark theme, built once at import and injected on
+# every run (Streamlit drops elements that a rerun does not emit again)
+_CSS = """
+        <style>
+        /* Dark theme base */
+        [data-testid="stAppViewContainer"] {
+            background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
+        }
+        
+        [data-testid="stHeader"] {
+            background-color: rgba(15, 23, 42, 0.8);
+        }
+        
+        /* Sidebar styling */
+        [data-testid="stSidebar"] {
+            background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%);
+        }
+        
+        /* Main header card */
+        .main-header {
+            background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%);
+            padding: 30px;
+            border-radius: 15px;
+            margin-bottom: 30px;
+            color: white;
+            box-shadow: 0 8px 32px rgba(59, 130, 246, 0.3);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+        }
+        
+        .main-header h1 {
+            font-size: 2.5em;
+            font-weight: 700;
+            margin: 0;
+            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
+        }
+        
+        .main-header p {
+            font-size: 1.1em;
+            opacity: 0.95;
+            margin-top: 10px;
+        }
+        
+        /* Metric cards */
+        [data-testid="stMetric"] {
+            background: linear-gradient(135deg, #1e293b 0%, #334155 100%);
+            padding: 20px;
+            border-radius: 12px;
+            border: 1px solid rgba(148, 163, 184, 0.2);
+            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.3);
+        }
+        
+        [data-testid="stMetricLabel"] {
+            color: #94a3b8 !important;
+            font-size: 0.9em !important;
+            font-weight: 600 !important;
+        }
+        
+        [data-testid="stMetricValue"] {
+            color: #f1f5f9 !important;
+            font-size: 2em !important;
+            font-weight: 700 !important;
+        }
+        
+        [data-testid="stMetricDelta"] {
+            color: #10b981 !important;
+        }
+        
+        /* Section headers */
+        .stMarkdown h3 {
+            color: #e2e8f0 !important;
+            font-weight: 600 !important;
+            padding-bottom: 10px;
+            border-bottom: 2px solid #3b82f6;
+            margin-bottom: 20px;
+        }
+        
+        /* Buttons */
+        .stButton > button {
+            background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
+            color: white;
+            border: none;
+            border-radius: 8px;
+            padding: 12px 24px;
+            font-weight: 600;
+            box-shadow: 0 4px 12px rgba(59, 130, 246, 0.4);
+            transition: all 0.3s ease;
+        }
+        
+        .stButton > button:hover {
+            background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
+            box-shadow: 0 6px 16px rgba(59, 130, 246, 0.5);
+            transform: translateY(-2px);
+        }
+        
+        /* Download buttons */
+        .stDownloadButton > button {
+            background: linear-gradient(135deg, #10b981 0%, #059669 100%);
+            color: white;
+            border: none;
+            border-radius: 8px;
+            font-weight: 600;
+            box-shadow: 0 4px 12px rgba(16, 185, 129, 0.4);
+        }
+        
+        /* Expander */
+        [data-testid="stExpander"] {
+            background: rgba(30, 41, 59, 0.6);
+            border: 1px solid rgba(148, 163, 184, 0.2);
+            border-radius: 12px;
+            backdrop-filter: blur(10px);
+        }
+        
+        /* Info boxes */
+        .stAlert {
+            background: rgba(30, 41, 59, 0.8);
+            border-left: 4px solid #3b82f6;
+            border-radius: 8px;
+            backdrop-filter: blur(10px);
+        }
+        
+        /* Dataframe */
+        [data-testid="stDataFrame"] {
+            background: rgba(30, 41, 59, 0.6);
+            border-radius: 12px;
+        }
+        
+        /* Input fields */
+        .stTextInput > div > div > input,
+        .stDateInput > div > div > input {
+            background: rgba(30, 41, 59, 0.8);
+            color: #f1f5f9;
+            border: 1px solid rgba(148, 163, 184, 0.3);
+            border-radius: 8px;
+        }
+        
+        /* Radio buttons */
+        .stRadio > label {
+            color: #e2e8f0 !important;
+        }
+        
+        /* Divider */
+        hr {
+            border-color: rgba(148, 163, 184, 0.2);
+            margin: 30px 0;
+        }
+        
+        /* Sidebar text */
+        .css-1d391kg, .st-emotion-cache-1d391kg {
+            color: #e2e8f0;
+        }
+        
+        /* Make all text readable */
+        p, span, label, div {
+            color: #e2e8f0;
+        }
+        
+        /* Plotly chart background */
+        .js-plotly-plot {
+            border-radius: 12px;
+            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.3);
+        }
+        </style>
+    """
 
 
 def init_session_state():
@@ -35,133 +212,301 @@ def init_session_state():
         st.session_state.prediction_results = None
     if 'uploaded_image' not in st.session_state:
         st.session_state.uploaded_image = None
+    if 'data_epoch' not in st.session_state:
+        st.session_state.data_epoch = 0
+
 
+@st.cache_resource
+def get_supabase_client() -> Client:
+    """Create the Supabase client once per process, stopping the app if it is not configured."""
+    if DB_URL and DB_KEY:
+        return create_client(DB_URL, DB_KEY)
+    st.error("⚠️ Database connection failed. Check environment variables.")
+    sys.exit(1)
 
-def load_data():
+
+@st.cache_resource
+def get_postgres_connection():
     """
-    Connect to Supabase and fetch all rows from the logs table.
+    Open one direct Postgres connection per process, if DB_POSTGRES_URL is set
+    and psycopg is installed; otherwise return None and use the REST API.
     """
-    if DB_URL and DB_KEY:
-        supabase: Client = create_client(DB_URL, DB_KEY)
+    if psycopg is None or not DB_POSTGRES_URL:
+        return None
+    # autocommit keeps no transaction open on the pooler; pgbouncer in
+    # transaction mode cannot hold server-side prepared statements
+    return psycopg.connect(
+        DB_POSTGRES_URL, autocommit=True, prepare_threshold=None, row_factory=dict_row
+    )
+
+
+def _select(query: str) -> list[dict]:
+    """Run a read-only query over the direct connection, returning row dicts."""
+    with get_postgres_connection().cursor() as cur:
+        cur.execute(query)
+        return cur.fetchall()
+
+
+# Fetchers are cached for CACHE_TTL seconds so widget interactions (each of
+# which reruns the script) don't hit the database again. They raise on
+# failure so errors are never cached; the load_* wrappers report them.
+# `epoch` is only part of the cache key: bumping st.session_state.data_epoch
+# (the Refresh button) forces a fresh fetch for this session only.
+CACHE_TTL = 30
+RAW_LOGS_PAGE_SIZE = 100
+PREDICTION_CLASSES = ['Fresh', 'Dry']
+# Two known labels: stored as int8 category codes rather than Python strings
+PREDICTION_DTYPE = pd.CategoricalDtype(categories=PREDICTION_CLASSES)
+# Figure builders are memoised on their (small) inputs; a rerun with the same
+# numbers reuses the figure instead of rebuilding Plotly's nested dicts
+FIGURE_CACHE_ENTRIES = 16
+
+# Returned as-is when the logs table is empty (cache_data hands out copies)
+_EMPTY_HOURLY_COUNTS = pd.DataFrame(
+    columns=PREDICTION_CLASSES,
+    index=pd.DatetimeIndex([], tz='UTC', name='hour'),
+    dtype='float64'
+)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_prediction_counts(epoch: int = 0) -> pd.Series:
+    # Aggregated in Postgres (see sql/logs_aggregates.sql): one row per class
+    if get_postgres_connection() is not None:
+        data = _select("select prediction, c from logs_agg")
+    else:
+        data = get_supabase_client().table("logs_agg").select("*").execute().data
+    counts = pd.Series(
+        [row['c'] for row in data or []],
+        index=[row['prediction'] for row in data or []],
+        dtype='int64'
+    )
+    # Same case rule as _pivot_hourly_counts, in case the view predates it
+    return counts.groupby(counts.index.str.capitalize()).sum() if len(counts) else counts
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_hourly_counts(epoch: int = 0) -> pd.DataFrame:
+    # Bucketed in Postgres (see sql/logs_aggregates.sql): one row per
+    # (hour, prediction), already ordered by hour
+    if get_postgres_connection() is not None:
+        data = _select("select hour, prediction, count from logs_hourly_counts()")
     else:
-        st.error("⚠️ Database connection failed. Check environment variables.")
-        sys.exit(1)
+        data = get_supabase_client().rpc("logs_hourly_counts", {}).execute().data
+    if not data:
+        return _EMPTY_HOURLY_COUNTS
+    rows = pd.DataFrame(data, columns=['hour', 'prediction', 'count'])
+    # Parsed once here, inside the cache; ISO8601 takes pandas' C fast path
+    rows['hour'] = pd.to_datetime(rows['hour'], format='ISO8601', utc=True)
+    return _pivot_hourly_counts(rows)
+
+
+def _pivot_hourly_counts(rows: pd.DataFrame) -> pd.DataFrame:
+    """Wide frame, one count column per class, that px.line plots directly."""
+    # Labels are matched case-insensitively; unknown ones become NaN and are
+    # dropped, and summing merges rows that now share an (hour, class) pair
+    labels = rows['prediction'].str.capitalize().astype(PREDICTION_DTYPE)
+    rows = rows.assign(prediction=labels).dropna(subset=['prediction'])
+    if rows.empty:
+        return _EMPTY_HOURLY_COUNTS
+    return (
+        rows.pivot_table(index='hour', columns='prediction', values='count',
+                         aggfunc='sum', observed=True)
+        .reindex(columns=PREDICTION_CLASSES)
+        .fillna(0)
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_raw_logs_page(page: int, epoch: int = 0) -> pd.DataFrame:
+    start = page * RAW_LOGS_PAGE_SIZE
+    response = (
+        get_supabase_client().table("logs")
+        .select("*")
+        .order("created_at", desc=True)
+        .range(start, start + RAW_LOGS_PAGE_SIZE - 1)
+        .execute()
+    )
+    df = pd.DataFrame(response.data or [])
+    if 'prediction' in df:
+        df['prediction'] = df['prediction'].astype(PREDICTION_DTYPE)
+    return df
+
+
+def load_prediction_counts():
+    """
+    Fetch the number of logged predictions per class (e.g. Fresh / Dry).
+    """
     try:
-        response = supabase.table("logs").select("*").execute()
-        json_data = response.data or []
-        df = pd.DataFrame(json_data)
-        return df
+        return _fetch_prediction_counts(st.session_state.data_epoch)
     except Exception as e:
         st.error(f'Error fetching data: {e}')
         return None
 
 
-def create_gauge_chart(value: float, title: str, max_value: float = 100):
-    """Create a gauge chart for metrics."""
+def load_hourly_counts():
+    """
+    Fetch the number of logged predictions per hour (index) and class (columns).
+    """
+    try:
+        return _fetch_hourly_counts(st.session_state.data_epoch)
+    except Exception as e:
+        st.error(f'Error fetching data: {e}')
+        return None
+
+
+def load_raw_logs(page: int):
+    """
+    Fetch one page of full log rows, newest first.
+    """
+    try:
+        return _fetch_raw_logs_page(page, st.session_state.data_epoch)
+    except Exception as e:
+        st.error(f'Error fetching data: {e}')
+        return None
+
+
+# Gauges are plain SVG strings rendered with st.markdown: a semicircle of
+# `pathLength` 100, so stroke-dasharray values are percentages of the dial.
+_GAUGE_ARC = "M 40 160 A 110 110 0 0 1 260 160"
+
+
+def _gauge_svg(value: float, max_value: float, color: str, height: int,
+               title: str = "", underlay: str = "", overlay: str = "") -> str:
+    """Build a semicircular gauge with the value arc, number and optional extras."""
+    pct = max(0.0, min(value / max_value, 1.0)) * 100
+    # Markup is injected with unsafe_allow_html, so text is escaped first
+    title_svg = (
+        f'<text x="150" y="22" text-anchor="middle" font-size="20" fill="#e2e8f0">{html.escape(title)}</text>'
+        if title else ''
+    )
+    return (
+        f'<div style="background: rgba(30, 41, 59, 0.4); border-radius: 8px;">'
+        f'<svg viewBox="0 0 300 200" width="100%" height="{height}" font-family="Arial">'
+        f'{title_svg}'
+        f'<path d="{_GAUGE_ARC}" fill="none" stroke="rgba(30, 41, 59, 0.6)" stroke-width="30"/>'
+        f'{underlay}'
+        f'<path d="{_GAUGE_ARC}" pathLength="100" fill="none" stroke="{color}" stroke-width="24" '
+        f'stroke-dasharray="{pct:.2f} 100"/>'
+        f'{overlay}'
+        f'<text x="150" y="150" text-anchor="middle" font-size="32" fill="#f1f5f9">{value:.1f}</text>'
+        f'</svg></div>'
+    )
+
+
+def _gauge_point(fraction: float, radius: float) -> tuple:
+    """Point on the dial at `fraction` (0 = left end, 1 = right end) of the sweep."""
+    angle = math.pi * (1 - fraction)
+    return 150 + radius * math.cos(angle), 160 - radius * math.sin(angle)
+
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def create_gauge_chart(value: float, title: str, max_value: float = 100) -> str:
+    """Create a gauge (SVG markup) for metrics, banded at the 5% / 15% QC limits."""
     color = "#10b981" if value <= 5 else "#f59e0b" if value <= 15 else "#ef4444"
     
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=value,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': title, 'font': {'size': 20, 'color': '#e2e8f0'}},
-        delta={'reference': 5, 'increasing': {'color': "#ef4444"}},
-        number={'font': {'color': '#f1f5f9', 'size': 32}},
-        gauge={
-            'axis': {
-                'range': [None, max_value],
-                'tickwidth': 2,
-                'tickcolor': "#64748b",
-                'tickfont': {'color': '#e2e8f0'}
-            },
-            'bar': {'color': color, 'thickness': 0.8},
-            'bgcolor': "rgba(30, 41, 59, 0.6)",
-            'borderwidth': 2,
-            'bordercolor': "#475569",
-            'steps': [
-                {'range': [0, 5], 'color': 'rgba(16, 185, 129, 0.2)'},
-                {'range': [5, 15], 'color': 'rgba(245, 158, 11, 0.2)'},
-                {'range': [15, max_value], 'color': 'rgba(239, 68, 68, 0.2)'}
-            ],
-            'threshold': {
-                'line': {'color': "#ef4444", 'width': 4},
-                'thickness': 0.75,
-                'value': 15
-            }
-        }
-    ))
+    steps = [
+        (0, 5, 'rgba(16, 185, 129, 0.2)'),
+        (5, 15, 'rgba(245, 158, 11, 0.2)'),
+        (15, max_value, 'rgba(239, 68, 68, 0.2)')
+    ]
+    underlay = ''.join(
+        f'<path d="{_GAUGE_ARC}" pathLength="100" fill="none" stroke="{step_color}" '
+        f'stroke-width="30" stroke-dasharray="0 {start / max_value * 100:.2f} '
+        f'{(end - start) / max_value * 100:.2f} 100"/>'
+        for start, end, step_color in steps
+    )
+    
+    # Threshold marker at the critical limit, plus the delta against the 5% target
+    (x1, y1), (x2, y2) = (_gauge_point(15 / max_value, r) for r in (90, 130))
+    delta = value - 5
+    delta_color = "#ef4444" if delta > 0 else "#10b981"
+    overlay = (
+        f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="#ef4444" stroke-width="4"/>'
+        f'<text x="150" y="185" text-anchor="middle" font-size="16" fill="{delta_color}">'
+        f'{"▲" if delta > 0 else "▼"} {delta:+.1f}</text>'
+    )
     
+    return _gauge_svg(value, max_value, color, 250, title, underlay, overlay)
+
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def create_distribution_chart(fresh_count: int, dry_count: int):
+    """Create a donut chart of the Fresh vs Dry split."""
+    import plotly.express as px  # deferred: ~100 ms import only paid when charting
+    
+    counts = pd.DataFrame({'prediction': PREDICTION_CLASSES, 'count': [fresh_count, dry_count]})
+    
+    fig = px.pie(
+        counts,
+        values='count',
+        names='prediction',
+        title='Fresh vs Dry Classification',
+        hole=0.4,
+        color_discrete_map={'Fresh': '#10b981', 'Dry': '#ef4444'}
+    )
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        textfont=dict(size=14, color='white', family='Arial')
+    )
     fig.update_layout(
-        height=250,
-        margin=dict(l=20, r=20, t=50, b=20),
+        height=300,
         paper_bgcolor="rgba(30, 41, 59, 0.4)",
         plot_bgcolor="rgba(30, 41, 59, 0.4)",
-        font={'color': "#e2e8f0", 'family': "Arial"}
+        font=dict(color="#e2e8f0"),
+        title_font=dict(color="#e2e8f0", size=16)
     )
     
     return fig
 
 
-def create_time_series_chart(df: pd.DataFrame):
-    """Create a time series chart showing quality trends."""
-    if df is None or len(df) == 0:
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def create_time_series_chart(hourly_counts: pd.DataFrame):
+    """Create a time series chart showing quality trends from hour x class counts."""
+    if hourly_counts is None or len(hourly_counts) == 0:
         return None
     
-    # Check for timestamp field (support both 'created_at' and 'timestamp')
-    timestamp_field = None
-    if 'created_at' in df.columns:
-        timestamp_field = 'created_at'
-    elif 'timestamp' in df.columns:
-        timestamp_field = 'timestamp'
-    
-    if timestamp_field:
-        df[timestamp_field] = pd.to_datetime(df[timestamp_field])
-        df = df.sort_values(timestamp_field)
-        
-        # Group by hour and prediction
-        df['hour'] = df[timestamp_field].dt.floor('H')
-        hourly_counts = df.groupby(['hour', 'prediction']).size().reset_index(name='count')
-        
-        fig = px.line(
-            hourly_counts,
-            x='hour',
-            y='count',
-            color='prediction',
-            title='Quality Trends Over Time (Hourly)',
-            labels={'hour': 'Time', 'count': 'Count', 'prediction': 'Classification'},
-            color_discrete_map={'Fresh': '#10b981', 'Dry': '#ef4444'}
-        )
-        
-        fig.update_layout(
-            height=400,
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1,
-                bgcolor="rgba(30, 41, 59, 0.8)",
-                font=dict(color="#e2e8f0")
-            ),
-            paper_bgcolor="rgba(30, 41, 59, 0.4)",
-            plot_bgcolor="rgba(30, 41, 59, 0.4)",
-            font=dict(color="#e2e8f0"),
-            xaxis=dict(
-                gridcolor="rgba(148, 163, 184, 0.2)",
-                color="#e2e8f0"
-            ),
-            yaxis=dict(
-                gridcolor="rgba(148, 163, 184, 0.2)",
-                color="#e2e8f0"
-            )
+    import plotly.express as px
+    
+    fig = px.line(
+        hourly_counts,
+        y=PREDICTION_CLASSES,
+        title='Quality Trends Over Time (Hourly)',
+        labels={'hour': 'Time', 'value': 'Count', 'prediction': 'Classification',
+                'variable': 'Classification'},
+        color_discrete_map={'Fresh': '#10b981', 'Dry': '#ef4444'}
+    )
+    
+    fig.update_layout(
+        height=400,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            bgcolor="rgba(30, 41, 59, 0.8)",
+            font=dict(color="#e2e8f0")
+        ),
+        paper_bgcolor="rgba(30, 41, 59, 0.4)",
+        plot_bgcolor="rgba(30, 41, 59, 0.4)",
+        font=dict(color="#e2e8f0"),
+        xaxis=dict(
+            gridcolor="rgba(148, 163, 184, 0.2)",
+            color="#e2e8f0"
+        ),
+        yaxis=dict(
+            gridcolor="rgba(148, 163, 184, 0.2)",
+            color="#e2e8f0"
         )
-        
-        return fig
+    )
     
-    return None
+    return fig
 
 
+@st.fragment
 def render_image_predictor():
     """Render the image upload and prediction section using the API."""
     st.markdown("---")
@@ -173,9 +518,6 @@ def render_image_predictor():
         </div>
     """, unsafe_allow_html=True)
     
-    # API URL configuration
-    API_URL = os.environ.get("API_URL", "https://csqa-cnn-api.onrender.com")
-    
     col_upload, col_result = st.columns([1, 1])
     
     with col_upload:
@@ -240,7 +582,7 @@ def render_image_predictor():
                             'total_fruits_found': total_fruits_found
                         }
                         st.success(f"✅ Analysis complete! Processed {len(all_results)} image(s), found {total_fruits_found} fruit(s)")
-                        st.rerun()
+                        st.rerun(scope="fragment")
                         
                     except requests.exceptions.Timeout:
                         st.error("❌ Request timeout. The API might be starting up (cold start). Please try again.")
@@ -267,8 +609,9 @@ def render_image_predictor():
                 for img_result in batch_results:
                     all_predictions.extend(img_result['results'])
                 
-                fresh_count = sum(1 for p in all_predictions if p['predicted_class'] == 'Fresh')
-                dry_count = sum(1 for p in all_predictions if p['predicted_class'] == 'Dry')
+                class_counts = Counter(p['predicted_class'] for p in all_predictions)
+                fresh_count = class_counts['Fresh']
+                dry_count = class_counts['Dry']
                 avg_confidence = sum(p['confidence'] for p in all_predictions) / len(all_predictions) if all_predictions else 0
                 
                 # Overall Summary
@@ -303,8 +646,9 @@ def render_image_predictor():
                     img_total = img_result['total_dates_found']
                     predictions = img_result['results']
                     
-                    img_fresh = sum(1 for p in predictions if p['predicted_class'] == 'Fresh')
-                    img_dry = sum(1 for p in predictions if p['predicted_class'] == 'Dry')
+                    img_counts = Counter(p['predicted_class'] for p in predictions)
+                    img_fresh = img_counts['Fresh']
+                    img_dry = img_counts['Dry']
                     
                     with st.expander(f"📷 Image {img_idx}: {img_name} ({img_total} fruit(s) - {img_fresh}✅ / {img_dry}❌)", expanded=(total_images == 1)):
                         # Individual fruit results for this image
@@ -337,25 +681,7 @@ def render_image_predictor():
                             
                             with col2:
                                 # Mini gauge
-                                fig = go.Figure(go.Indicator(
-                                    mode="gauge+number",
-                                    value=confidence,
-                                    domain={'x': [0, 1], 'y': [0, 1]},
-                                    gauge={
-                                        'axis': {'range': [0, 100], 'tickcolor': "#e2e8f0"},
-                                        'bar': {'color': color},
-                                        'bgcolor': "rgba(30, 41, 59, 0.4)",
-                                        'borderwidth': 2,
-                                        'bordercolor': "#475569"
-                                    }
-                                ))
-                                fig.update_layout(
-                                    height=120,
-                                    margin=dict(l=5, r=5, t=5, b=5),
-                                    paper_bgcolor="rgba(0,0,0,0)",
-                                    font={'color': "#e2e8f0", 'size': 9}
-                                )
-                                st.plotly_chart(fig, use_container_width=True, key=f"fruit_gauge_{img_idx}_{idx}")
+                                st.markdown(_gauge_svg(confidence, 100, color, 120), unsafe_allow_html=True)
                 
                 # Quality Assessment
                 rejection_rate = (dry_count / total_fruits_found * 100) if total_fruits_found > 0 else 0
@@ -404,6 +730,7 @@ def render_image_predictor():
             """, unsafe_allow_html=True)
 
 
+@st.fragment
 def render_report_generator():
     """Render the time-based report generator section."""
     st.markdown("---")
@@ -420,9 +747,7 @@ def render_report_generator():
     
     with db_status_col2:
         # Show database connection status
-        db_url = os.environ.get("DB_API")
-        db_key = os.environ.get("DB_SERVICE_ROLE_KEY")
-        if db_url and db_key:
+        if DB_URL and DB_KEY:
             st.success("🔗 Connected")
         else:
             st.error("❌ No DB Config")
@@ -495,19 +820,21 @@ def render_report_generator():
             button_label = "🤖 Generate AI Report" if not button_disabled else "⚠️ No Data to Report"
             
             if st.button(button_label, type="primary", disabled=button_disabled):
-                with st.spinner("Generating report with AI... This may take 5-10 seconds"):
+                with st.spinner("Generating report with AI..."):
                     try:
                         reporter = GeminiQCReporter()
-                        markdown_report = reporter.generate_report(
+                        # Text appears as Gemini produces it instead of after
+                        # the whole response; write_stream returns the full text
+                        markdown_report = st.write_stream(reporter.generate_report_stream(
                             total=total,
                             fresh=fresh,
                             dry=dry,
                             time_period=time_period
-                        )
+                        ))
                         st.session_state.generated_report = markdown_report
                         st.session_state.report_stats = stats
                         st.success("✅ Report generated successfully!")
-                        st.rerun()
+                        st.rerun(scope="fragment")
                     except Exception as e:
                         st.error(f"❌ Error generating report: {e}")
                         st.info("💡 Make sure GEMINI_API_KEY environment variable is set.")
@@ -535,24 +862,21 @@ def render_report_generator():
             if st.button("📥 Download as PDF", type="secondary"):
                 try:
                     with st.spinner("Generating PDF..."):
-                        pdf_gen = PDFGenerator()
-                        pdf_path = pdf_gen.markdown_to_pdf(
-                            st.session_state.generated_report,
-                            filename=f"QC_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                        # Rendered in memory: no file is written just to be read back
+                        pdf_bytes = PDFGenerator().markdown_to_pdf_bytes(
+                            st.session_state.generated_report
                         )
                         
-                        # Read the PDF file
-                        with open(pdf_path, 'rb') as f:
-                            pdf_bytes = f.read()
-                        
                         st.download_button(
                             label="💾 Save PDF",
                             data=pdf_bytes,
-                            file_name=os.path.basename(pdf_path),
+                            file_name=PDFGenerator.pdf_filename(
+                                f"QC_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                            ),
                             mime="application/pdf"
                         )
                         
-                        st.success(f"✅ PDF ready! Saved to: {pdf_path}")
+                        st.success("✅ PDF ready!")
                 except Exception as e:
                     st.error(f"❌ Error generating PDF: {e}")
         
@@ -583,167 +907,7 @@ def main():
     init_session_state()
     
     # Custom CSS for modern dark theme
-    st.markdown("""
-        <style>
-        /* Dark theme base */
-        [data-testid="stAppViewContainer"] {
-            background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-        }
-        
-        [data-testid="stHeader"] {
-            background-color: rgba(15, 23, 42, 0.8);
-        }
-        
-        /* Sidebar styling */
-        [data-testid="stSidebar"] {
-            background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%);
-        }
-        
-        /* Main header card */
-        .main-header {
-            background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%);
-            padding: 30px;
-            border-radius: 15px;
-            margin-bottom: 30px;
-            color: white;
-            box-shadow: 0 8px 32px rgba(59, 130, 246, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        .main-header h1 {
-            font-size: 2.5em;
-            font-weight: 700;
-            margin: 0;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-        }
-        
-        .main-header p {
-            font-size: 1.1em;
-            opacity: 0.95;
-            margin-top: 10px;
-        }
-        
-        /* Metric cards */
-        [data-testid="stMetric"] {
-            background: linear-gradient(135deg, #1e293b 0%, #334155 100%);
-            padding: 20px;
-            border-radius: 12px;
-            border: 1px solid rgba(148, 163, 184, 0.2);
-            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.3);
-        }
-        
-        [data-testid="stMetricLabel"] {
-            color: #94a3b8 !important;
-            font-size: 0.9em !important;
-            font-weight: 600 !important;
-        }
-        
-        [data-testid="stMetricValue"] {
-            color: #f1f5f9 !important;
-            font-size: 2em !important;
-            font-weight: 700 !important;
-        }
-        
-        [data-testid="stMetricDelta"] {
-            color: #10b981 !important;
-        }
-        
-        /* Section headers */
-        .stMarkdown h3 {
-            color: #e2e8f0 !important;
-            font-weight: 600 !important;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #3b82f6;
-            margin-bottom: 20px;
-        }
-        
-        /* Buttons */
-        .stButton > button {
-            background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-            color: white;
-            border: none;
-            border-radius: 8px;
-            padding: 12px 24px;
-            font-weight: 600;
-            box-shadow: 0 4px 12px rgba(59, 130, 246, 0.4);
-            transition: all 0.3s ease;
-        }
-        
-        .stButton > button:hover {
-            background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
-            box-shadow: 0 6px 16px rgba(59, 130, 246, 0.5);
-            transform: translateY(-2px);
-        }
-        
-        /* Download buttons */
-        .stDownloadButton > button {
-            background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-            color: white;
-            border: none;
-            border-radius: 8px;
-            font-weight: 600;
-            box-shadow: 0 4px 12px rgba(16, 185, 129, 0.4);
-        }
-        
-        /* Expander */
-        [data-testid="stExpander"] {
-            background: rgba(30, 41, 59, 0.6);
-            border: 1px solid rgba(148, 163, 184, 0.2);
-            border-radius: 12px;
-            backdrop-filter: blur(10px);
-        }
-        
-        /* Info boxes */
-        .stAlert {
-            background: rgba(30, 41, 59, 0.8);
-            border-left: 4px solid #3b82f6;
-            border-radius: 8px;
-            backdrop-filter: blur(10px);
-        }
-        
-        /* Dataframe */
-        [data-testid="stDataFrame"] {
-            background: rgba(30, 41, 59, 0.6);
-            border-radius: 12px;
-        }
-        
-        /* Input fields */
-        .stTextInput > div > div > input,
-        .stDateInput > div > div > input {
-            background: rgba(30, 41, 59, 0.8);
-            color: #f1f5f9;
-            border: 1px solid rgba(148, 163, 184, 0.3);
-            border-radius: 8px;
-        }
-        
-        /* Radio buttons */
-        .stRadio > label {
-            color: #e2e8f0 !important;
-        }
-        
-        /* Divider */
-        hr {
-            border-color: rgba(148, 163, 184, 0.2);
-            margin: 30px 0;
-        }
-        
-        /* Sidebar text */
-        .css-1d391kg, .st-emotion-cache-1d391kg {
-            color: #e2e8f0;
-        }
-        
-        /* Make all text readable */
-        p, span, label, div {
-            color: #e2e8f0;
-        }
-        
-        /* Plotly chart background */
-        .js-plotly-plot {
-            border-radius: 12px;
-            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.3);
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_CSS, unsafe_allow_html=True)
     
     # Header
     st.markdown("""
@@ -755,10 +919,11 @@ def main():
     
     # Sidebar
     with st.sidebar:
-        st.image("https://via.placeholder.com/200x80/1e40af/ffffff?text=Smart+Harvest", width=200)
+        st.image(LOGO_PATH, width=200)
         st.markdown("### 🎛️ Dashboard Controls")
         
         if st.button("🔄 Refresh Data"):
+            st.session_state.data_epoch += 1
             st.rerun()
         
         st.markdown("---")
@@ -767,11 +932,7 @@ def main():
         
         # Database connection status
         st.markdown("### 🔌 Connection Status")
-        db_url = os.environ.get("DB_API")
-        db_key = os.environ.get("DB_SERVICE_ROLE_KEY")
-        gemini_key = os.environ.get("GEMINI_API_KEY")
-        
-        if db_url and db_key:
+        if DB_URL and DB_KEY:
             st.success("✅ Database Connected")
         else:
             st.error("❌ Database Not Configured")
@@ -781,7 +942,7 @@ export DB_API="your_supabase_url"
 export DB_SERVICE_ROLE_KEY="your_key"
                 """)
         
-        if gemini_key:
+        if GEMINI_KEY:
             st.success("✅ Gemini AI Connected")
         else:
             st.warning("⚠️ Gemini AI Not Configured")
@@ -794,17 +955,17 @@ export GEMINI_API_KEY="your_api_key"
         st.markdown("### 📊 Quick Stats")
         st.markdown("View real-time quality metrics and generate comprehensive reports.")
     
-    # Load data
-    data = load_data()
+    # Load data (per-class totals are aggregated by the database)
+    counts = load_prediction_counts()
     
-    if data is None or len(data) == 0:
+    if counts is None or counts.sum() == 0:
         st.warning("⚠️ No data found in the database.")
         st.stop()
     
     # Main metrics
-    total_count = len(data)
-    fresh_count = data['prediction'].value_counts().get('Fresh', 0)
-    dry_count = data['prediction'].value_counts().get('Dry', 0)
+    total_count = int(counts.sum())
+    fresh_count = int(counts.get('Fresh', 0))
+    dry_count = int(counts.get('Dry', 0))
     dry_percentage = (dry_count / total_count * 100) if total_count > 0 else 0
     
     # Top metrics row
@@ -827,39 +988,16 @@ export GEMINI_API_KEY="your_api_key"
     
     with viz_col1:
         st.markdown("### 🎯 Loss Rate Monitor")
-        gauge_fig = create_gauge_chart(dry_percentage, "Rejection Rate (%)", 30)
-        st.plotly_chart(gauge_fig, use_container_width=True, key="rejection_rate_gauge")
+        st.markdown(create_gauge_chart(dry_percentage, "Rejection Rate (%)", 30), unsafe_allow_html=True)
     
     with viz_col2:
         st.markdown("### 📊 Distribution Analysis")
-        prediction_counts = data['prediction'].value_counts().reset_index()
-        prediction_counts.columns = ['prediction', 'count']
-        
-        pie_fig = px.pie(
-            prediction_counts,
-            values='count',
-            names='prediction',
-            title='Fresh vs Dry Classification',
-            hole=0.4,
-            color_discrete_map={'Fresh': '#10b981', 'Dry': '#ef4444'}
-        )
-        pie_fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            textfont=dict(size=14, color='white', family='Arial')
-        )
-        pie_fig.update_layout(
-            height=300,
-            paper_bgcolor="rgba(30, 41, 59, 0.4)",
-            plot_bgcolor="rgba(30, 41, 59, 0.4)",
-            font=dict(color="#e2e8f0"),
-            title_font=dict(color="#e2e8f0", size=16)
-        )
+        pie_fig = create_distribution_chart(fresh_count, dry_count)
         st.plotly_chart(pie_fig, use_container_width=True, key="distribution_pie_chart")
     
     # Time series chart
     st.markdown("---")
-    time_series_fig = create_time_series_chart(data)
+    time_series_fig = create_time_series_chart(load_hourly_counts())
     if time_series_fig:
         st.plotly_chart(time_series_fig, use_container_width=True, key="time_series_chart")
     
@@ -869,10 +1007,15 @@ export GEMINI_API_KEY="your_api_key"
     # Report generator section
     render_report_generator()
     
-    # Data table (collapsible)
+    # Data table (collapsible, fetched page by page only when requested)
     st.markdown("---")
     with st.expander("🗂️ View Raw Data"):
-        st.dataframe(data, use_container_width=True)
+        if st.toggle("Load raw logs", key="show_raw_logs"):
+            page_count = max(1, -(-total_count // RAW_LOGS_PAGE_SIZE))
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            raw_logs = load_raw_logs(int(page) - 1)
+            if raw_logs is not None:
+                st.dataframe(raw_logs, use_container_width=True)
 
 
 if __name__ == '__main__':
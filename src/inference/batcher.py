@@ -0,0 +1,90 @@
+"""
+Dynamic Micro-Batching Module
+Merges inference requests from concurrent callers into shared model calls
+"""
+
+import asyncio
+from contextlib import suppress
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects crop batches from concurrent requests and runs them together.
+
+    Each request submits its own (N, H, W, C) batch. Pending batches are
+    concatenated and sent to the model in one call once `max_batch_size`
+    crops are waiting or `max_delay_ms` has passed since the first one
+    arrived; each caller then receives its own slice of the scores.
+    """
+
+    def __init__(self, infer, executor, max_batch_size=32, max_delay_ms=5.0):
+        """
+        Args:
+            infer: Callable mapping an (N, H, W, C) array to (N, classes) scores
+            executor: Executor the (blocking) infer callable runs on
+            max_batch_size (int): Flush as soon as this many crops are queued
+            max_delay_ms (float): Longest time a crop waits for companions
+        """
+        self._infer = infer
+        self._executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Start the batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the batching loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    async def submit(self, batch: np.ndarray) -> np.ndarray:
+        """Queue a batch of crops and wait for its scores."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((batch, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_delay
+
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            await self._flush(pending, loop)
+
+    async def _flush(self, pending, loop):
+        batches = [batch for batch, _ in pending]
+        try:
+            scores = await loop.run_in_executor(
+                self._executor, self._infer, np.concatenate(batches)
+            )
+        except Exception as e:  # hand the failure to every waiting request
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offsets = np.cumsum([len(batch) for batch in batches])[:-1]
+        for (_, future), part in zip(pending, np.split(scores, offsets)):
+            if not future.done():  # the client may have gone away
+                future.set_result(part)
@@ -3,81 +3,147 @@ A client-side script that acts like a camera on a conveyor belt.
 It needs to perform a specific loop indefinitely (or until it runs out of test images)
 """
 
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 from time import sleep
 from pathlib import Path
 import sys
 import random
 import requests
 
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
 
 # Configuration
 # API_URL = 'https://csqa-cnn-api.onrender.com'
 API_URL = 'http://0.0.0.0:8000' # Uncomment for local testing
 IMAGES_PATH = '/home/abenajib/csqa-cnn/data/test'
 DELAY = 2
+BATCH_SIZE = 8 # Images sent per request
+MAX_IN_FLIGHT = 8 # Uploads allowed to overlap
+
+# One keep-alive connection pool shared by all uploads
+session = requests.Session()
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
 
 def get_images(folder):
-    """Recursively find all images in the folder."""
-    p = Path(folder)
-    extensions = ['*.jpg', '*.jpeg', '*.png']
+    """Recursively find all images in the folder (one directory walk, any case suffix)."""
     images = []
-    for ext in extensions:
-        images.extend(p.rglob(ext))
+    stack = [folder]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.rpartition('.')[2].lower() in IMAGE_EXTENSIONS:
+                    images.append(Path(entry.path))
     return images
 
+def send_batch(img_paths):
+    """
+    POST several images to the batch prediction endpoint in one request.
+
+    With requests_toolbelt installed the multipart body is streamed from the
+    files in small chunks instead of being assembled in memory first.
+    """
+    with ExitStack() as stack:
+        fields = [
+            ("files", (
+                path.name,
+                stack.enter_context(open(path, 'rb')),
+                mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+            ))
+            for path in img_paths
+        ]
+        if MultipartEncoder is None:
+            return session.post(
+                f"{API_URL}/upload_and_predict_batch/",
+                files=fields,
+                timeout=60 # Wait up to 60s (for Render cold starts)
+            )
+
+        encoder = MultipartEncoder(fields=fields)
+        return session.post(
+            f"{API_URL}/upload_and_predict_batch/",
+            data=encoder,
+            headers={"Content-Type": encoder.content_type},
+            timeout=60
+        )
+
+def report(filenames, future):
+    """Print the outcome of one batch upload once its request completes."""
+    try:
+        response = future.result()
+
+        if response.status_code == 200:
+            # One entry per uploaded image, in upload order
+            for data in response.json().get('images', []):
+                filename = data.get('filename')
+                dates_found = data.get('total_dates_found', 0)
+                predictions = data.get('results', [])
+
+                if dates_found == 0:
+                    print(f"   ⚠️  {filename}: No dates detected (Empty Belt)")
+                else:
+                    print(f"   ⚡ {filename}: Found {dates_found} objects:")
+                    # Loop through each detected date
+                    for i, pred in enumerate(predictions, 1):
+                        label = pred['predicted_class']
+                        conf = pred['confidence']
+
+                        # Visual feedback
+                        icon = "✅" if label == "Fresh" else "🚨"
+                        print(f"      {i}. {icon} {label} ({conf:.1f}%)")
+
+        else:
+            print(f"❌ {', '.join(filenames)}: Server Error {response.status_code}: {response.text}")
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Connection Failed. Is the API running?")
+    except Exception as e:
+        print(f"❌ {', '.join(filenames)}: Error: {e}")
+
 def simulate_camera(image_list):
     """
-    Main loop: Pick an image, send it, print result.
+    Main loop: Capture an image every DELAY seconds and send every
+    BATCH_SIZE captures in one request, without waiting for earlier
+    uploads; results print as they come back.
     """
     print(f"🚀 Simulation started. {len(image_list)} images in queue.")
     print("-" * 50)
 
-    try:
-        for img_path in image_list:
-            filename = img_path.name
-            print(f"\n📸 Capture: {filename}")
-            try:
-                with open(img_path, 'rb') as f:
-                    # Send POST request
-                    response = requests.post(
-                        f"{API_URL}/upload_and_predict/",
-                        files={"file": f},
-                        timeout=60 # Wait up to 60s (for Render cold starts)
-                    )
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    # The new API returns a 'results' list
-                    dates_found = data.get('total_dates_found', 0)
-                    predictions = data.get('results', [])
-
-                    if dates_found == 0:
-                        print("   ⚠️  No dates detected (Empty Belt)")
-                    else:
-                        print(f"   ⚡ Found {dates_found} objects:")
-                        # Loop through each detected date
-                        for i, pred in enumerate(predictions, 1):
-                            label = pred['predicted_class']
-                            conf = pred['confidence']
-
-                            # Visual feedback
-                            icon = "✅" if label == "Fresh" else "🚨"
-                            print(f"      {i}. {icon} {label} ({conf:.1f}%)")
+    pool = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT)
 
-                else:
-                    print(f"❌ Server Error {response.status_code}: {response.text}")
+    def submit(batch):
+        future = pool.submit(send_batch, batch)
+        future.add_done_callback(partial(report, [path.name for path in batch]))
 
-            except requests.exceptions.ConnectionError:
-                print("❌ Connection Failed. Is the API running?")
-            except Exception as e:
-                print(f"❌ Error: {e}")
+    try:
+        batch = []
+        for img_path in image_list:
+            print(f"\n📸 Capture: {img_path.name}")
+            batch.append(img_path)
+            if len(batch) == BATCH_SIZE:
+                submit(batch)
+                batch = []
 
             # Wait for the next item
             sleep(DELAY)
 
+        if batch:
+            submit(batch)
+        pool.shutdown(wait=True)
+
     except KeyboardInterrupt:
         print("\n🛑 Simulation stopped by user.")
+        pool.shutdown(wait=False, cancel_futures=True)
         sys.exit(0)
 
 if __name__ == '__main__':
@@ -4,9 +4,10 @@ Handles AI inference for date fruit classification (Fresh vs Rotten)
 """
 
 import os
-import tensorflow as tf
+import cv2
 import numpy as np
 import keras
+import tensorflow as tf
 
 class FruitPredictor:
     """
@@ -15,6 +16,9 @@ class FruitPredictor:
     Uses MobileNetV2 pre-trained model to classify dates into:
     - Grade 1 (Fresh): Suitable for packaging
     - Grade 3 (Rotten): Rejected/Discarded
+
+    A `.tflite` model path (see training/export.py) is run with the TFLite
+    interpreter instead of Keras, avoiding Keras' per-call dispatch overhead.
     """
 
     CLASSES = ['Fresh', 'Rotten']
@@ -23,15 +27,21 @@ class FruitPredictor:
     NORMALIZATION_SCALE = 255.0
 
 
-    def __init__(self, model_path='models/mobilenet_dates.keras'):
+    def __init__(self, model_path='models/mobilenet_dates.keras', delegate=None):
         """
         Initialize the predictor with a model path.
 
         Args:
-            model_path (str): Path to the trained .keras model file
+            model_path (str): Path to the trained .keras or converted .tflite model file
+            delegate (str): Optional TFLite delegate library for .tflite models,
+                e.g. 'libedgetpu.so.1'. Without one, float models already run
+                on TFLite's built-in XNNPACK CPU kernels
         """
         self.model_path = model_path
+        self.delegate = delegate
         self.model = None  # Model loaded lazily on first prediction
+        self.interpreter = None
+        self._infer = None  # (N, 224, 224, 3) float32 batch -> (N, classes) scores
 
 
     def _build_architecture(self):
@@ -74,6 +84,10 @@ class FruitPredictor:
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"❌ Model file missing at: {self.model_path}")
 
+        if self.model_path.endswith('.tflite'):
+            self._load_tflite()
+            return
+
         try:
             self.model = keras.models.load_model(self.model_path)
             print(f"✅ Model loaded successfully from {self.model_path}")
@@ -82,10 +96,48 @@ class FruitPredictor:
             print("   Switching to safe-mode: rebuild architecture + load weights...")
 
             self.model = self._build_architecture()
-            self.model.predict(np.zeros((1, 224, 224, 3)))
+            # Create the layer weights without running a forward pass
+            self.model.build(input_shape=(None, *self.IMAGE_SIZE, 3))
             self.model.load_weights(self.model_path)
             print("✅ Weights loaded successfully in safe-mode!")
 
+        # Trace the forward pass once; calling it skips Model.predict's
+        # per-call batching/callback machinery
+        model = self.model
+        forward = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec([None, *self.IMAGE_SIZE, 3], tf.float32)]
+        ).get_concrete_function()
+        self._infer = lambda img_array: forward(tf.convert_to_tensor(img_array)).numpy()
+        # Warm up so the first real prediction doesn't pay graph setup
+        self._infer(np.zeros((1, *self.IMAGE_SIZE, 3), dtype=np.float32))
+
+    def _load_tflite(self):
+        """
+        Load a converted TFLite model into an interpreter and bind its I/O tensors.
+        """
+        delegates = [tf.lite.experimental.load_delegate(self.delegate)] if self.delegate else None
+        self.interpreter = tf.lite.Interpreter(
+            model_path=self.model_path,
+            num_threads=os.cpu_count(),
+            experimental_delegates=delegates
+        )
+        self.interpreter.allocate_tensors()
+        input_index = self.interpreter.get_input_details()[0]['index']
+        output_index = self.interpreter.get_output_details()[0]['index']
+
+        def run(img_array):
+            # Converted models are built for batch 1; resize for other batches
+            if tuple(self.interpreter.get_input_details()[0]['shape']) != img_array.shape:
+                self.interpreter.resize_tensor_input(input_index, img_array.shape)
+                self.interpreter.allocate_tensors()
+            self.interpreter.set_tensor(input_index, img_array)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(output_index)
+
+        self._infer = run
+        print(f"✅ TFLite model loaded successfully from {self.model_path}")
+
     def predict(self, image_input):
         """
         Run inference on an image to classify fruit quality.
@@ -93,7 +145,8 @@ class FruitPredictor:
         Args:
             image_input: Either a file path (str) or numpy array
                         - str: Path to image file
-                        - ndarray: Image array (will normalize to 0-1 range)
+                        - ndarray: uint8 image array (scaled to 0-1 range),
+                          or a float array already in the 0-1 range
 
         Returns:
             dict: Prediction result containing:
@@ -102,30 +155,35 @@ class FruitPredictor:
                 - 'is_anomaly' (bool): True if Rotten, False if Fresh
         """
         # Load model on first prediction (lazy loading)
-        if not isinstance(self.model, keras.Model):
+        if self._infer is None:
             self.load_model()
-            if not isinstance(self.model, keras.Model):
-                raise RuntimeError("Model failed to load properly. Is not a Keras Model instance.")
 
         # === PREPROCESSING: Convert input to model-ready format ===
         if isinstance(image_input, str):
-            # Path-based input: Load image from disk
-            img = keras.utils.load_img(image_input, target_size=self.IMAGE_SIZE)
-            img_array = keras.utils.img_to_array(img)
-            img_array = tf.expand_dims(img_array, 0)
+            # Path-based input: decode + resize in OpenCV (BGR -> RGB for the model);
+            # camera frames are larger than 224px, where INTER_AREA averages
+            # pixels instead of aliasing
+            img = cv2.imread(image_input, cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError(f"Could not read image file: {image_input}")
+            img = cv2.resize(img, self.IMAGE_SIZE, interpolation=cv2.INTER_AREA)
+            img_array = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)[None, ...]
         else:
-            img_array = np.asarray(image_input, dtype=np.float32)
-            if len(img_array.shape) == 3:
-                img_array = np.expand_dims(img_array, 0)
-            elif len(img_array.shape) != 4:
+            img_array = np.asarray(image_input)
+            if img_array.ndim == 3:
+                img_array = img_array[None, ...]
+            elif img_array.ndim != 4:
                 raise ValueError(f"Expected 3D or 4D array, got shape {img_array.shape}")
-        if np.max(img_array) > 1.0:
-            img_array = img_array / self.NORMALIZATION_SCALE
-        # Ensure float32 type for model
-        img_array = np.asarray(img_array, dtype=np.float32)
+        # uint8 pixels are cast and scaled in a single pass; float input is
+        # taken as already normalized (no max() probe over the pixels) and
+        # passed through untouched when it is contiguous float32 already
+        if img_array.dtype == np.uint8:
+            img_array = np.multiply(img_array, np.float32(1.0 / self.NORMALIZATION_SCALE), dtype=np.float32)
+        else:
+            img_array = np.ascontiguousarray(img_array, dtype=np.float32)
 
         # === INFERENCE: Get model predictions ===
-        predictions = self.model.predict(img_array)
+        predictions = self._infer(img_array)
 
         # Extract class with highest probability
         predicted_class_idx = np.argmax(predictions[0])
@@ -137,3 +195,40 @@ class FruitPredictor:
             "confidence": confidence_score,
             "is_anomaly": (predicted_label == 'Rotten')
         }
+
+    def predict_batch(self, crops):
+        """
+        Classify several crops (e.g. from detection.detect_and_crop) in one model call.
+
+        Args:
+            crops (list[np.ndarray]): uint8 BGR image crops of any size, as
+                cv2 decodes them (swapped to RGB here, like path inputs to predict)
+
+        Returns:
+            list[dict]: One prediction per crop, in order, shaped like predict()'s result
+        """
+        if not crops:
+            return []
+        if self._infer is None:
+            self.load_model()
+
+        # cv2 resizes straight into the batch slots (dst must stay uint8);
+        # one fused cast-and-scale then yields the float32 model input
+        batch = np.empty((len(crops), self.IMAGE_SIZE[1], self.IMAGE_SIZE[0], 3), dtype=np.uint8)
+        for i, crop in enumerate(crops):
+            cv2.resize(crop, self.IMAGE_SIZE, dst=batch[i], interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(batch[i], cv2.COLOR_BGR2RGB, dst=batch[i])
+        batch = np.multiply(batch, np.float32(1.0 / self.NORMALIZATION_SCALE), dtype=np.float32)
+
+        predictions = self._infer(batch)
+        labels = [self.CLASSES[i] for i in predictions.argmax(axis=1)]
+        confidences = (predictions.max(axis=1) * 100).tolist()
+
+        return [
+            {
+                "label": label,
+                "confidence": confidence,
+                "is_anomaly": (label == 'Rotten')
+            }
+            for label, confidence in zip(labels, confidences)
+        ]
@@ -0,0 +1,37 @@
+"""File transfer helpers shared by the dataset preparation scripts."""
+
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+COPY_WORKERS = 16  # file operations are syscall-latency bound, not CPU bound
+
+
+def link_or_copy(src_path: str, dst_path: str) -> None:
+    """Hardlink src_path to dst_path (no data copied), copying when linking fails.
+
+    An existing dst_path is replaced, never written through: it may be a
+    hardlink to another source image from an earlier run.
+    """
+    try:
+        os.link(src_path, dst_path)
+    except FileExistsError:
+        # A rerun finds the link already in place
+        if os.path.samefile(src_path, dst_path):
+            return
+        os.unlink(dst_path)
+        link_or_copy(src_path, dst_path)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EMLINK):
+            raise
+        # Other filesystem or no hardlink support
+        if os.path.lexists(dst_path):
+            os.unlink(dst_path)
+        shutil.copy2(src_path, dst_path)
+
+
+def transfer_all(transfers) -> None:
+    """Run link_or_copy over (src_path, dst_path) pairs, many in flight at once."""
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        list(pool.map(lambda paths: link_or_copy(*paths), transfers))
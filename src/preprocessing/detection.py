@@ -15,6 +15,10 @@ ZOOMED_IN_THRESHOLD = 0.50
 CROP_PADDING = 10
 MORPH_KERNEL = (7, 7)
 DARK_CROP_THRESHOLD = 20
+MASK_LONG_SIDE = 512  # segmentation runs on a copy no larger than this
+
+# Built once; a full rectangle lets OpenCV run morphology as separable 1D passes
+_MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, MORPH_KERNEL)
 
 def show_and_save(img, title="", cmap=None, n='0'):
     plt.figure(figsize=(5, 5))
@@ -30,29 +34,41 @@ def show_and_save(img, title="", cmap=None, n='0'):
 def _create_foreground_mask(image: np.ndarray) -> np.ndarray:
     # show_and_save(image, "Original Image", n='0')
 
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    s_channel = hsv[:, :, 1]
-    # show_and_save(s_channel, "HSV - Saturation Channel", cmap="gray", n='HSV')
+    # One SIMD pass for HSV, then a contiguous copy of S that every later
+    # step reuses in place instead of allocating a new buffer each time
+    mask = cv2.extractChannel(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), 1)
+    # show_and_save(mask, "HSV - Saturation Channel", cmap="gray", n='HSV')
 
-    blurred = cv2.GaussianBlur(s_channel, (5, 5), 0)
-    # show_and_save(blurred, "Blurred S Channel", cmap="gray", n='blur')
+    cv2.GaussianBlur(mask, (5, 5), 0, dst=mask)
+    # show_and_save(mask, "Blurred S Channel", cmap="gray", n='blur')
 
-    _, mask = cv2.threshold(
-        blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-    )
+    cv2.threshold(mask, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=mask)
     # show_and_save(mask, "Thresholded Mask", cmap="gray", n='threshold')
 
-    kernel = np.ones(MORPH_KERNEL, np.uint8)
-    # show_and_save(kernel * 255, "Morph Kernel", cmap="gray", n='0')
-
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
+    cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _MORPH_KERNEL, dst=mask, iterations=2)
     # show_and_save(mask, "After MORPH_CLOSE", cmap="gray", n='morph_closex2')
 
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
+    cv2.morphologyEx(mask, cv2.MORPH_OPEN, _MORPH_KERNEL, dst=mask, iterations=1)
     # show_and_save(mask, "After morphology (Final Mask)", cmap="gray", n='morph_openx1')
 
     return mask
 
+def _downscale_for_mask(image: np.ndarray) -> tuple[np.ndarray, float]:
+    """Shrink the image so its long side is at most MASK_LONG_SIDE; return it and the scale used."""
+    scale = MASK_LONG_SIDE / max(image.shape[:2])
+    if scale >= 1.0:
+        return image, 1.0
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+def _to_full_resolution(box: tuple, scale: float) -> tuple:
+    """Map an (x, y, w, h) box on the mask back to the full-resolution image."""
+    if scale == 1.0:
+        return box
+    x, y, w, h = box
+    x1, y1 = int(x / scale), int(y / scale)
+    x2, y2 = int(np.ceil((x + w) / scale)), int(np.ceil((y + h) / scale))
+    return x1, y1, x2 - x1, y2 - y1
+
 def _padded_crop(image: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
     h_img, w_img = image.shape[:2]
     y1 = max(0, y - CROP_PADDING)
@@ -65,53 +81,136 @@ def _decode_image(image_bytes: bytes) -> np.ndarray | None:
     nparr = np.frombuffer(image_bytes, np.uint8)
     return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
-def _is_too_dark(crop: np.ndarray) -> bool:
-    """Return True if the crop is mostly black (e.g. a shadow or conveyor edge)."""
-    return cv2.mean(crop)[0] < DARK_CROP_THRESHOLD
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 size in the DCT domain
+_REDUCED_DECODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _jpeg_size(image_bytes: bytes) -> tuple[int, int] | None:
+    """Read (height, width) from a JPEG's frame header without decoding it."""
+    data = memoryview(image_bytes)
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            return (data[i + 5] << 8) | data[i + 6], (data[i + 7] << 8) | data[i + 8]
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+def _decode_preview(image_bytes: bytes) -> tuple[np.ndarray | None, float]:
+    """
+    Decode the image for mask computation, as small as MASK_LONG_SIDE allows.
+
+    Large JPEGs are decoded at a DCT-domain reduction; anything else is
+    decoded in full. Returns the image and its scale relative to full size.
+    """
+    size = _jpeg_size(image_bytes)
+    if size is not None:
+        for factor, flag in _REDUCED_DECODES:
+            if max(size) // factor >= MASK_LONG_SIDE:
+                nparr = np.frombuffer(image_bytes, np.uint8)
+                return cv2.imdecode(nparr, flag), 1.0 / factor
+    return _decode_image(image_bytes), 1.0
+
+def _padded_box_means(image: np.ndarray, boxes: np.ndarray, padding: float) -> np.ndarray:
+    """
+    Mean of the first (blue) channel inside each padded (x, y, w, h) box.
+
+    One integral image makes every box an O(1) lookup, so all boxes are
+    measured with a few array ops instead of one cv2.mean call per crop.
+    """
+    h_img, w_img = image.shape[:2]
+    ii = cv2.integral(cv2.extractChannel(image, 0))
+    x, y, w, h = boxes.T
+    x1 = np.clip(np.floor(x - padding), 0, w_img).astype(np.intp)
+    y1 = np.clip(np.floor(y - padding), 0, h_img).astype(np.intp)
+    x2 = np.clip(np.ceil(x + w + padding), 0, w_img).astype(np.intp)
+    y2 = np.clip(np.ceil(y + h + padding), 0, h_img).astype(np.intp)
+    sums = ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]
+    return sums / np.maximum((x2 - x1) * (y2 - y1), 1)
 
 def detect_and_crop(image_bytes: bytes) -> list:
-    image = _decode_image(image_bytes)
-    if image is None:
+    preview, decode_scale = _decode_preview(image_bytes)
+    if preview is None:
         logger.error("Failed to decode image")
         return []
 
-    mask = _create_foreground_mask(image)
+    # Segment a downscaled copy; boxes are scaled back and cropped from the
+    # full-resolution image, which is only decoded once there is something
+    # to crop
+    small, scale = _downscale_for_mask(preview)
+    scale *= decode_scale
+    mask = _create_foreground_mask(small)
+    min_area = MIN_OBJECT_AREA * scale * scale
+
+    def full_image():
+        return preview if decode_scale == 1.0 else _decode_image(image_bytes)
 
-    # Check scene type based on the largest contour
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Blob bounding boxes and pixel areas in one labelling pass; row 0 is
+    # the background. Columns 0-3 are CC_STAT_LEFT/TOP/WIDTH/HEIGHT.
+    n_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:n_labels]
 
-    if not contours:
+    if not len(stats):
         return []
 
-    largest = max(contours, key=cv2.contourArea)
-    coverage = cv2.contourArea(largest) / (image.shape[0] * image.shape[1])
+    # Check scene type based on the largest blob
+    largest = stats[stats[:, cv2.CC_STAT_AREA].argmax()]
+    coverage = largest[cv2.CC_STAT_AREA] / mask.size
 
     # Scenario 1: Zoomed in single date
     if coverage > ZOOMED_IN_THRESHOLD:
         logger.info(f"Scene: Zoomed-In (Coverage: {coverage:.2f})")
-        x, y, w, h = cv2.boundingRect(largest)
-        return [_padded_crop(image, x, y, w, h)]
+        x, y, w, h = _to_full_resolution(tuple(largest[:4].tolist()), scale)
+        return [_padded_crop(full_image(), x, y, w, h)]
 
     # Scenario 2: Conveyor belt (multiple items)
     # --- Multiple small items (conveyor belt) ---
     logger.info("Detected a conveyor-belt scene – scanning for individual dates")
-    crops = []
-
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-
-        if w * h < MIN_OBJECT_AREA:
-            continue  # too small to be a real date
-
-        crop = _padded_crop(image, x, y, w, h)
-
-        if _is_too_dark(crop):
-            continue  # likely a shadow or belt edge, not a date
-
-        crops.append(crop)
+    box_areas = stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT]
+    boxes = stats[box_areas >= min_area, :4]  # smaller is not a real date
+
+    # Mostly-black boxes are shadows or belt edges, not dates. Measured on
+    # the downscaled copy the mask came from, so rejecting them costs no
+    # full-resolution work at all.
+    if len(boxes):
+        means = _padded_box_means(small, boxes, CROP_PADDING * scale)
+        boxes = boxes[means >= DARK_CROP_THRESHOLD]
+
+    logger.info("Found %d valid date object(s)", len(boxes))
+    if not len(boxes):
+        return []
 
-    logger.info("Found %d valid date object(s)", len(crops))
-    return crops
+    image = full_image()
+    return [_padded_crop(image, *_to_full_resolution(box, scale)) for box in boxes.tolist()]
+
+def crops_to_batch(crops: list, size: tuple = (224, 224)) -> np.ndarray:
+    """Resize BGR crops (as cv2 decodes them) into one contiguous uint8 RGB
+    (N, H, W, 3) batch, the channel order the model was trained on."""
+    batch = np.empty((len(crops), size[1], size[0], 3), dtype=np.uint8)
+    for i, crop in enumerate(crops):
+        # dst must share the crop's dtype for cv2 to write in place
+        cv2.resize(crop, size, dst=batch[i])
+        cv2.cvtColor(batch[i], cv2.COLOR_BGR2RGB, dst=batch[i])
+    return batch
+
+def detect_and_batch(image_bytes: bytes, size: tuple = (224, 224)) -> np.ndarray:
+    """Detect dates in an encoded image and return them as a model-ready batch.
+
+    Self-contained so it can run in a worker process: only the small uint8
+    batch travels back to the caller.
+    """
+    return crops_to_batch(detect_and_crop(image_bytes), size)
 
 if __name__ == '__main__':
 
@@ -1,8 +1,8 @@
 """Module providing a function to reorganize the dataset into Variety_Size_Grade format"""
 
 import os
-import shutil
 from pathlib import Path
+from preprocessing._fileops import transfer_all
 
 SOURCE_ROOT = "/home/abenajib/csqa-cnn/data/Augmented Date Fruit Dataset"
 
@@ -15,8 +15,8 @@ def reorganize_dataset():
     """
     Reorganize dataset by categorizing images into Fresh and Rotten directories.
     
-    This function walks through the SOURCE_ROOT directory structure, identifies folders
-    based on FRESH_KEYWORDS and ROTTEN_KEYWORDS, and copies image files to corresponding
+    This function scans the SOURCE_ROOT directory structure, identifies folders
+    based on FRESH_KEYWORDS and ROTTEN_KEYWORDS, and hardlinks (or copies) image files to corresponding
     destination directories (Fresh or Rotten). Each copied file is renamed with a prefix
     derived from the last 3 parts of its source path (typically Variety_Size_Grade).
     
@@ -24,7 +24,8 @@ def reorganize_dataset():
     
     Side effects:
       - Creates 'Fresh' and 'Rotten' subdirectories in TARGET_ROOT
-      - Copies image files to destination directories with renamed filenames
+      - Hardlinks image files into destination directories with renamed filenames,
+        copying them when the target is on another filesystem
       - Prints reorganization progress and summary statistics to console
     
     Returns:
@@ -38,8 +39,12 @@ def reorganize_dataset():
 
     count_fresh = 0
     count_rotten = 0
+    transfers = []
 
-    for root, _, files in os.walk(SOURCE_ROOT):
+    # One scandir per directory: entry types come from readdir, no stat per file
+    directories = [SOURCE_ROOT]
+    while directories:
+        root = directories.pop()
         folder_name = os.path.basename(root)
         destination = None
 
@@ -48,25 +53,26 @@ def reorganize_dataset():
         elif folder_name in ROTTEN_KEYWORDS:
             destination = rotten_dir
 
-        if destination:
-            for file in files:
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                    path_parts = Path(root).parts
-                    # Example parts: ('Dataset', 'Aseel', 'Large', 'Grade-1')
-                    # We assume the last 3 parts are meaningful (Variety_Size_Grade)
-                    prefix = "_".join(path_parts[-3:])
-                    new_filename = f"{prefix}_{file}"
+        # Example parts: ('Dataset', 'Aseel', 'Large', 'Grade-1')
+        # We assume the last 3 parts are meaningful (Variety_Size_Grade)
+        prefix = "_".join(Path(root).parts[-3:])
 
-                    src_path = os.path.join(root, file)
-                    dst_path = os.path.join(destination, new_filename)
-
-                    shutil.copy2(src_path, dst_path)
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif destination and entry.name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
+                    dst_path = os.path.join(destination, f"{prefix}_{entry.name}")
+                    transfers.append((entry.path, dst_path))
 
                     if destination == fresh_dir:
                         count_fresh += 1
                     else:
                         count_rotten += 1
 
+    # Independent per-file operations: keep many in flight at once
+    transfer_all(transfers)
+
     print("-" * 30)
     print("✅ Reorganization Complete!")
     print(f"📦 Total Fresh (Grade 1): {count_fresh}")
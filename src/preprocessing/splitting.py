@@ -3,6 +3,7 @@
 import os
 import shutil
 import random
+from preprocessing._fileops import transfer_all
 
 # Default Values
 SOURCE_ROOT = "/home/abenajib/csqa-cnn/data/dates_dataset_ready"
@@ -17,7 +18,8 @@ def split_dataset(source_root : str   = SOURCE_ROOT,
     Splits a dataset of images into training and testing sets based on predefined class labels.
 
     The function creates directories for the training and testing datasets for each class,
-    copies the images from the source directory to the respective destination directories,
+    hardlinks (or, across filesystems, copies) the images from the source directory to the
+    respective destination directories,
     and shuffles the images before splitting them into training and testing sets.
 
     The dataset is split according to the train_split ratio, which determines the proportion
@@ -41,6 +43,7 @@ def split_dataset(source_root : str   = SOURCE_ROOT,
 
     print(f"🚀 Splitting dataset from '{source_root}'...")
 
+    transfers = []
     for class_name in classes:
         class_dir = os.path.join(source_root, class_name)
         if not os.path.exists(class_dir):
@@ -48,10 +51,11 @@ def split_dataset(source_root : str   = SOURCE_ROOT,
             continue
 
         valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
-        images = [
-            f for f in os.listdir(class_dir)
-            if f.lower().endswith(valid_extensions)
-        ]
+        with os.scandir(class_dir) as entries:
+            images = [
+                entry.name for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(valid_extensions)
+            ]
 
         random.shuffle(images)
 
@@ -61,15 +65,14 @@ def split_dataset(source_root : str   = SOURCE_ROOT,
 
         print(f"   Processing '{class_name}': {len(train_imgs)} Train / {len(test_imgs)} Test")
 
-        for filename in train_imgs:
-            src = os.path.join(class_dir, filename)
-            dst = os.path.join(dest_root, 'train', class_name, filename)
-            shutil.copy2(src, dst)
+        for split, split_imgs in (('train', train_imgs), ('test', test_imgs)):
+            transfers.extend(
+                (os.path.join(class_dir, filename), os.path.join(dest_root, split, class_name, filename))
+                for filename in split_imgs
+            )
 
-        for filename in test_imgs:
-            src = os.path.join(class_dir, filename)
-            dst = os.path.join(dest_root, 'test', class_name, filename)
-            shutil.copy2(src, dst)
+    # Independent per-file operations: keep many in flight at once
+    transfer_all(transfers)
 
     print("-" * 30)
     print("✅ Split Complete!")
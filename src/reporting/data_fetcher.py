@@ -1,9 +1,32 @@
 # src/reporting/data_fetcher.py
 import os
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Optional, Tuple, Union
 from supabase import create_client, Client
 
+# Rolling windows are re-queried at most once per bucket (minute for
+# hours/all-time, hour for days); ranges that ended in the past never change.
+SUMMARY_CACHE_SIZE = 64
+MINUTE = 60
+HOUR = 3600
+
+
+@lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def _cached_summary(client: Client, since: Optional[str], until: Optional[str],
+                    bucket: Optional[int]) -> tuple:
+    """Run logs_summary once per (since, until, bucket); bucket only keys the cache."""
+    response = client.rpc("logs_summary", {"since": since, "until": until}).execute()
+    return tuple(response.data or [])
+
+
+def _time_bucket(seconds: int) -> int:
+    """Index of the current wall-clock interval of the given length."""
+    return int(time.time() // seconds)
+
 
 class DataFetcher:
     """
@@ -13,18 +36,32 @@ class DataFetcher:
     Note: This class expects the database 'logs' table to have:
     - 'created_at' field: ISO 8601 timestamp (e.g., '2026-02-14T01:14:48.850995+00:00')
     - 'prediction' field: Classification result ('Fresh' or 'Dry')
+    and the logs_summary function from sql/logs_aggregates.sql, which counts
+    predictions in Postgres so only one row per class is transferred.
     """
 
+    # One client (and HTTP connection pool) for every instance in the process
+    _shared_client: Optional[Client] = None
+    _client_lock = threading.Lock()
+
     def __init__(self, debug: bool = False):
-        db_url = os.environ.get("DB_API")
-        db_key = os.environ.get("DB_SERVICE_ROLE_KEY")
-        
-        if not db_url or not db_key:
-            raise ValueError("DB_API and DB_SERVICE_ROLE_KEY must be set in environment")
-        
-        self.supabase: Client = create_client(db_url, db_key)
+        self.supabase: Client = self._get_client()
         self.debug = debug
 
+    @classmethod
+    def _get_client(cls) -> Client:
+        """Create the shared Supabase client on first use."""
+        with cls._client_lock:
+            if cls._shared_client is None:
+                db_url = os.environ.get("DB_API")
+                db_key = os.environ.get("DB_SERVICE_ROLE_KEY")
+                
+                if not db_url or not db_key:
+                    raise ValueError("DB_API and DB_SERVICE_ROLE_KEY must be set in environment")
+                
+                cls._shared_client = create_client(db_url, db_key)
+            return cls._shared_client
+
     def fetch_all_data(self) -> Dict[str, Union[int, str]]:
         """
         Fetch all records and return aggregated statistics.
@@ -33,8 +70,7 @@ class DataFetcher:
             Dict with keys: total, fresh, dry, time_period
         """
         try:
-            response = self.supabase.table("logs").select("*").execute()
-            data = response.data or []
+            data = self._fetch_summary(bucket=_time_bucket(MINUTE))
             return self._aggregate_data(data, "All time")
         except Exception as e:
             print(f"Error fetching all data: {e}")
@@ -50,25 +86,20 @@ class DataFetcher:
         Returns:
             Dict with keys: total, fresh, dry, time_period
         """
-        start_time = datetime.now() - timedelta(hours=hours)
+        bucket = _time_bucket(MINUTE)
+        start_time = datetime.fromtimestamp(bucket * MINUTE) - timedelta(hours=hours)
         start_time_str = start_time.isoformat()
         
         if self.debug:
             print(f"[DEBUG] Fetching last {hours} hours")
             print(f"[DEBUG] Start time: {start_time_str}")
-            print(f"[DEBUG] Query: created_at >= '{start_time_str}'")
+            print(f"[DEBUG] Query: logs_summary(since => '{start_time_str}')")
         
         try:
-            response = (
-                self.supabase.table("logs")
-                .select("*")
-                .gte("created_at", start_time_str)
-                .execute()
-            )
-            data = response.data or []
+            data = self._fetch_summary(since=start_time_str, bucket=bucket)
             
             if self.debug:
-                print(f"[DEBUG] Retrieved {len(data)} records")
+                print(f"[DEBUG] Retrieved {len(data)} class counts")
             
             time_period = f"Last {hours} hour{'s' if hours > 1 else ''}"
             return self._aggregate_data(data, time_period)
@@ -89,16 +120,11 @@ class DataFetcher:
         """
         start_str = start_date.isoformat()
         end_str = end_date.isoformat()
+        # A finished range is immutable; one still open is refreshed per minute
+        bucket = None if end_date < datetime.now() else _time_bucket(MINUTE)
         
         try:
-            response = (
-                self.supabase.table("logs")
-                .select("*")
-                .gte("created_at", start_str)
-                .lte("created_at", end_str)
-                .execute()
-            )
-            data = response.data or []
+            data = self._fetch_summary(since=start_str, until=end_str, bucket=bucket)
             time_period = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
             return self._aggregate_data(data, time_period)
         except Exception as e:
@@ -115,42 +141,53 @@ class DataFetcher:
         Returns:
             Dict with keys: total, fresh, dry, time_period
         """
-        start_date = datetime.now() - timedelta(days=days)
+        bucket = _time_bucket(HOUR)
+        start_date = datetime.fromtimestamp(bucket * HOUR) - timedelta(days=days)
         start_date_str = start_date.isoformat()
         
         try:
-            response = (
-                self.supabase.table("logs")
-                .select("*")
-                .gte("created_at", start_date_str)
-                .execute()
-            )
-            data = response.data or []
+            data = self._fetch_summary(since=start_date_str, bucket=bucket)
             time_period = f"Last {days} day{'s' if days > 1 else ''}"
             return self._aggregate_data(data, time_period)
         except Exception as e:
             print(f"Error fetching data for last {days} days: {e}")
             return {"total": 0, "fresh": 0, "dry": 0, "time_period": f"Last {days} days (Error)"}
 
+    def _fetch_summary(self, since: Optional[str] = None, until: Optional[str] = None,
+                       bucket: Optional[int] = None) -> tuple:
+        """
+        Count log records per prediction in Postgres (logs_summary RPC).
+        
+        Args:
+            since: Optional ISO timestamp lower bound (inclusive)
+            until: Optional ISO timestamp upper bound (inclusive)
+            bucket: Time bucket the result stays cached for (None = forever)
+            
+        Returns:
+            Tuple of {"prediction": str, "n": int} rows, one per class
+        """
+        return _cached_summary(self.supabase, since, until, bucket)
+
     def _aggregate_data(self, data: list, time_period: str) -> Dict[str, Union[int, str]]:
         """
-        Aggregate raw data into statistics.
+        Turn per-class counts into statistics.
         
         Args:
-            data: List of log records
+            data: List of {"prediction", "n"} rows from _fetch_summary
             time_period: Description of the time period
             
         Returns:
             Dict with keys: total, fresh, dry, time_period
         """
-        total = len(data)
-        fresh = sum(1 for record in data if record.get("prediction", "").lower() == "fresh")
-        dry = sum(1 for record in data if record.get("prediction", "").lower() == "dry")
+        # Fold labels case-insensitively, as the stored values may vary in case
+        counts = Counter()
+        for row in data:
+            counts[(row.get("prediction") or "").lower()] += row.get("n", 0)
         
         return {
-            "total": total,
-            "fresh": fresh,
-            "dry": dry,
+            "total": sum(counts.values()),
+            "fresh": counts["fresh"],
+            "dry": counts["dry"],
             "time_period": time_period
         }
 
@@ -162,19 +199,14 @@ class DataFetcher:
             hours: Number of hours to look back
             
         Returns:
-            List of dicts with created_at, fresh_count, dry_count
+            List of dicts with hour, fresh_count, dry_count (one per hour, in order)
         """
         start_time = datetime.now() - timedelta(hours=hours)
         start_time_str = start_time.isoformat()
         
         try:
-            response = (
-                self.supabase.table("logs")
-                .select("*")
-                .gte("created_at", start_time_str)
-                .order("created_at")
-                .execute()
-            )
+            # Bucketed in Postgres (logs_hourly), so the payload is O(hours)
+            response = self.supabase.rpc("logs_hourly", {"since": start_time_str}).execute()
             return response.data or []
         except Exception as e:
             print(f"Error fetching time series data: {e}")
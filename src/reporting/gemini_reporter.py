@@ -1,82 +1,124 @@
 # src/reporting/gemini_reporter.py
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import cache
+from typing import Iterator, List
 from google import genai  # pip install -U google-genai
 from google.genai import types
+from pydantic import BaseModel, ValidationError
 
+try:
+    import diskcache  # pip install diskcache
+except ImportError:
+    diskcache = None
 
-class GeminiQCReporter:
+# Reports are a pure function of (model, prompt), so identical statistics are
+# answered from memory, then from disk (survives restarts), before calling Gemini
+REPORT_CACHE_SIZE = 1024
+REPORT_CACHE_DIR = os.path.expanduser(os.environ.get("GEMINI_CACHE_DIR", "~/.cache/csqa_gemini"))
+_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+# Reports are produced from threadpool and async paths: guards the LRU and
+# GeminiQCReporter.cache_hits
+_cache_lock = threading.Lock()
+
+
+@cache
+def _get_disk_cache():
     """
-    Generates a QC (Quality Control) report from statistics (total/fresh/dry).
+    Open the on-disk report cache on first use, so importing this module (e.g.
+    in a preloading server's master, before it forks) creates no directory or
+    SQLite handles. Returns None without diskcache or if the directory is unusable.
     """
+    if diskcache is None:
+        return None
+    try:
+        return diskcache.Cache(REPORT_CACHE_DIR)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Report disk cache disabled ({REPORT_CACHE_DIR}): {e}")
+        return None
 
-    def __init__(self, model_name: str = "gemini-2.5-flash"):
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY is missing. Put it in .env or export it.")
-        self.client = genai.Client(api_key=api_key)
-        self.model_name = model_name
 
-    @staticmethod
-    def _severity(reject_rate: float) -> str:
-        if reject_rate > 15:
-            return "CRITICAL"
-        if reject_rate > 5:
-            return "WARNING"
-        return "OK"
+@cache
+def _get_client(api_key: str) -> genai.Client:
+    """One Gemini client (and HTTP connection pool) per API key for the whole process."""
+    return genai.Client(api_key=api_key)
 
-    def generate_report(self, total: int, fresh: int, dry: int, time_period: str = "") -> str:
-        if total <= 0:
-            return "Cannot generate report: total = 0."
-        if fresh < 0 or dry < 0 or (fresh + dry) > total:
-            return "Cannot generate report: inconsistent statistics."
 
-        reject_rate = (dry / total) * 100.0
-        accept_rate = (fresh / total) * 100.0
-        severity = self._severity(reject_rate)
+def _cache_key(model_name: str, *prompt_parts: str) -> str:
+    return hashlib.blake2b("\0".join((model_name, *prompt_parts)).encode(), digest_size=16).hexdigest()
+
+
+def _cache_get(key: str):
+    with _cache_lock:
+        report = _memory_cache.get(key)
+        if report is not None:
+            _memory_cache.move_to_end(key)
+            GeminiQCReporter.cache_hits += 1
+            return report
+
+    disk_cache = _get_disk_cache()
+    report = disk_cache.get(key) if disk_cache is not None else None
+    if report is not None:
+        _cache_put(key, report, persist=False)
+        with _cache_lock:
+            GeminiQCReporter.cache_hits += 1
+    return report
+
+
+def _cache_put(key: str, report: str, persist: bool = True) -> None:
+    with _cache_lock:
+        _memory_cache[key] = report
+        _memory_cache.move_to_end(key)
+        if len(_memory_cache) > REPORT_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
 
-        time_context = f"Time Period: {time_period}\n" if time_period else ""
+    disk_cache = _get_disk_cache() if persist else None
+    if disk_cache is not None:
+        disk_cache.set(key, report)
 
-        prompt = f"""
+
+# Static role/format scaffold, sent as the system instruction so every request
+# shares an identical prefix; only the Batch Data block varies per call
+SYSTEM_INSTRUCTION = """
 You are a Quality Control Manager in a date fruit processing facility.
-Generate a CONCISE executive quality control report in Markdown format.
+Generate a CONCISE executive quality control report in Markdown format
+from the Batch Data you are given.
 
 Context:
 - Automated sorting classifies fruits as Fresh (accepted) or Dry (rejected).
 - Dry = desiccation / moisture loss / fails premium quality standards.
 
-Batch Data:
-- {time_context}Total Processed: {total}
-- Fresh (Accepted): {fresh} ({accept_rate:.1f}%)
-- Dry (Rejected): {dry} ({reject_rate:.1f}%)
-- Status: {severity} (OK ≤ 5%, WARNING 5-15%, CRITICAL > 15%)
-
 Requirements:
 - **Maximum 200 words** - managers need executive summaries, not essays
 - **Data-first approach** - prioritize numbers, percentages, tables over prose
 - **No invented data** - use only the provided statistics
 - **Actionable insights only** - no generic advice
 
-Mandatory Structure:
+Mandatory Structure (fill the [Batch Data] values in exactly as given):
 
 ## Quality Control Report
 
 ### 📊 Key Metrics
 | Metric | Value | Status |
 |--------|-------|--------|
-| Total Processed | {total} | - |
-| Fresh (Accepted) | {fresh} ({accept_rate:.1f}%) | ✓ |
-| Dry (Rejected) | {dry} ({reject_rate:.1f}%) | {severity} |
-| Loss Rate | {reject_rate:.1f}% | {severity} |
+| Total Processed | [Total Processed] | - |
+| Fresh (Accepted) | [Fresh count] ([Fresh %]) | ✓ |
+| Dry (Rejected) | [Dry count] ([Dry %]) | [Status] |
+| Loss Rate | [Dry %] | [Status] |
 
-### 🎯 Status: **{severity}**
+### 🎯 Status: **[Status]**
 
-{{% if severity == "CRITICAL" %}}
+{% if Status == "CRITICAL" %}
 **Immediate Action Required**: Loss rate exceeds 15% threshold.
-{{% elif severity == "WARNING" %}}
+{% elif Status == "WARNING" %}
 **Attention Needed**: Loss rate above normal range (5-15%).
-{{% else %}}
+{% else %}
 **Normal Operations**: Loss rate within acceptable limits.
-{{% endif %}}
+{% endif %}
 
 ### ⚡ Top 3 Actions
 1. [Most critical action based on severity]
@@ -88,18 +130,226 @@ Mandatory Structure:
 - [Probable cause 2]
 
 ---
-*Report generated on {time_context.strip() if time_context else 'current batch'}*
+*Report generated on [Time Period, or 'current batch' if none is given]*
 *Requires Quality Manager approval before distribution*
 
 Keep it visual, data-heavy, and under 200 words of actual text content.
 """
 
+# Per-request part of the prompt (see GeminiQCReporter._prepare)
+BATCH_PROMPT = """
+Batch Data:
+- {time_context}Total Processed: {total}
+- Fresh (Accepted): {fresh} ({accept_rate:.1f}%)
+- Dry (Rejected): {dry} ({reject_rate:.1f}%)
+- Status: {severity} (OK ≤ 5%, WARNING 5-15%, CRITICAL > 15%)
+"""
+
+_GENERATION_CONFIG = types.GenerateContentConfig(
+    system_instruction=SYSTEM_INSTRUCTION,
+    temperature=0.3,
+    top_p=0.85,
+)
+
+
+class ReportItem(BaseModel):
+    """One report in a batched (JSON mode) response, see generate_reports."""
+
+    batch: int
+    markdown: str
+
+
+# Several Batch Data blocks answered in one call, one report per block
+_BATCH_GENERATION_CONFIG = types.GenerateContentConfig(
+    system_instruction=SYSTEM_INSTRUCTION,
+    temperature=0.3,
+    top_p=0.85,
+    response_mime_type="application/json",
+    response_schema=list[ReportItem],
+)
+
+
+def _parse_report_items(parsed, text: str) -> dict:
+    """
+    Map batch number -> Markdown from a JSON mode response. Malformed or
+    truncated JSON yields no items and invalid items are skipped, so one bad
+    entry only costs its own batch.
+    """
+    items = parsed
+    if not items:
+        try:
+            items = json.loads(text or "[]")
+        except json.JSONDecodeError:
+            return {}
+    if not isinstance(items, list):
+        return {}
+
+    reports = {}
+    for item in items:
+        try:
+            if not isinstance(item, ReportItem):
+                item = ReportItem(**item)
+        except (ValidationError, TypeError):
+            continue
+        reports[item.batch] = item.markdown.strip()
+    return reports
+
+
+class GeminiQCReporter:
+    """
+    Generates a QC (Quality Control) report from statistics (total/fresh/dry).
+    """
+
+    cache_hits = 0  # reports served without calling Gemini (process-wide)
+
+    def __init__(self, model_name: str = "gemini-2.5-flash", shared_client: bool = True):
+        """
+        Args:
+            model_name: Gemini model to call
+            shared_client: Use the process-wide client. Pass False for a
+                private client, e.g. for async calls inside a short-lived event
+                loop: the async transport's pooled connections belong to the
+                loop that opened them
+        """
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is missing. Put it in .env or export it.")
+        self.client = _get_client(api_key) if shared_client else genai.Client(api_key=api_key)
+        self.model_name = model_name
+
+    @staticmethod
+    def _severity(reject_rate: float) -> str:
+        if reject_rate > 15:
+            return "CRITICAL"
+        if reject_rate > 5:
+            return "WARNING"
+        return "OK"
+
+    def _prepare(self, total: int, fresh: int, dry: int, time_period: str):
+        """Validate the stats and build the prompt; returns (ready_report, prompt, cache_key)."""
+        if total <= 0:
+            return "Cannot generate report: total = 0.", None, None
+        if fresh < 0 or dry < 0 or (fresh + dry) > total:
+            return "Cannot generate report: inconsistent statistics.", None, None
+
+        # Keyed on the inputs and templates, so a hit skips building the prompt
+        key = _cache_key(self.model_name, SYSTEM_INSTRUCTION, BATCH_PROMPT,
+                         str(total), str(fresh), str(dry), time_period)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached, None, key
+
+        reject_rate = (dry / total) * 100.0
+        accept_rate = (fresh / total) * 100.0
+
+        prompt = BATCH_PROMPT.format(
+            time_context=f"Time Period: {time_period}\n" if time_period else "",
+            total=total,
+            fresh=fresh,
+            accept_rate=accept_rate,
+            dry=dry,
+            reject_rate=reject_rate,
+            severity=self._severity(reject_rate),
+        )
+        return None, prompt, key
+
+    @staticmethod
+    def _finish(key: str, resp) -> str:
+        report = (resp.text or "").strip()
+        if not report:
+            return "Report generation failed (retry)."
+        _cache_put(key, report)
+        return report
+
+    def generate_report(self, total: int, fresh: int, dry: int, time_period: str = "") -> str:
+        report, prompt, key = self._prepare(total, fresh, dry, time_period)
+        if report is not None:
+            return report
+        return self._call(prompt, key)
+
+    def _call(self, prompt: str, key: str) -> str:
+        """Send a prepared prompt to Gemini and cache the report under key."""
         resp = self.client.models.generate_content(
             model=self.model_name,
             contents=types.Part.from_text(text=prompt),
-            config=types.GenerateContentConfig(
-                temperature=0.3,
-                top_p=0.85,
-            ),
+            config=_GENERATION_CONFIG,
+        )
+        return self._finish(key, resp)
+
+    def generate_report_stream(self, total: int, fresh: int, dry: int, time_period: str = "") -> Iterator[str]:
+        """Same as generate_report, yielding the text as Gemini streams it (cached once complete)."""
+        report, prompt, key = self._prepare(total, fresh, dry, time_period)
+        if report is not None:
+            yield report
+            return
+
+        parts = []
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=types.Part.from_text(text=prompt),
+            config=_GENERATION_CONFIG,
+        ):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+
+        report = "".join(parts).strip()
+        if not report:
+            yield "Report generation failed (retry)."
+            return
+        _cache_put(key, report)
+
+    def generate_reports(self, batches: List[dict]) -> List[str]:
+        """
+        Generate reports for several stat batches (dicts with total, fresh, dry
+        and optionally time_period) with a single Gemini call for all uncached ones.
+
+        Returns:
+            One Markdown report per batch, in order
+        """
+        reports, pending = [], []
+        for i, stats in enumerate(batches):
+            report, prompt, key = self._prepare(
+                stats["total"], stats["fresh"], stats["dry"], stats.get("time_period", "")
+            )
+            reports.append(report)
+            if report is None:
+                pending.append((i, prompt, key))
+
+        if len(pending) == 1:
+            i, prompt, key = pending[0]
+            reports[i] = self._call(prompt, key)
+        elif pending:
+            prompt = (
+                "Write one complete report per batch below, following the mandatory "
+                "structure for each. Return a JSON array with one item per batch: "
+                "its batch number and the report Markdown.\n"
+                + "".join(f"\n# Batch {n}\n{batch_prompt}" for n, (_, batch_prompt, _) in enumerate(pending))
+            )
+            resp = self.client.models.generate_content(
+                model=self.model_name,
+                contents=types.Part.from_text(text=prompt),
+                config=_BATCH_GENERATION_CONFIG,
+            )
+            by_batch = _parse_report_items(resp.parsed, resp.text)
+
+            for n, (i, _, key) in enumerate(pending):
+                report = by_batch.get(n, "")
+                if report:
+                    _cache_put(key, report)
+                reports[i] = report or "Report generation failed (retry)."
+
+        return reports
+
+    async def generate_report_async(self, total: int, fresh: int, dry: int, time_period: str = "") -> str:
+        """Same as generate_report, awaiting Gemini's async client so calls can overlap."""
+        report, prompt, key = self._prepare(total, fresh, dry, time_period)
+        if report is not None:
+            return report
+
+        resp = await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=types.Part.from_text(text=prompt),
+            config=_GENERATION_CONFIG,
         )
-        return (resp.text or "").strip() or "Report generation failed (retry)."
+        return self._finish(key, resp)
@@ -1,9 +1,17 @@
 # src/reporting/pdf_generator.py
+import asyncio
+import multiprocessing
 import os
+import threading
+import xml.etree.ElementTree as etree
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import markdown
+from markdown.extensions import Extension
+from markdown.inlinepatterns import InlineProcessor
+from markdown.util import AtomicString
 
 try:
     from weasyprint import HTML, CSS
@@ -11,12 +19,55 @@ except ImportError:
     HTML = None  # type: ignore
     CSS = None  # type: ignore
 
+# Status keywords are wrapped in spans so the stylesheet can colour them
+STATUS_PATTERN = r'\b(CRITICAL|WARNING|OK)\b'
+
+
+class _StatusInlineProcessor(InlineProcessor):
+    """Wrap a status keyword in a status-<LEVEL> span."""
+
+    def handleMatch(self, m, data):
+        span = etree.Element("span")
+        span.set("class", f"status-{m.group(1)}")
+        span.text = AtomicString(m.group(1))
+        return span, m.start(0), m.end(0)
+
+
+class _StatusExtension(Extension):
+    """
+    Runs as an inline pattern, i.e. on text nodes only: code spans, fenced
+    code, link targets and image alt text are left untouched.
+    """
+
+    def extendMarkdown(self, md):
+        md.inlinePatterns.register(_StatusInlineProcessor(STATUS_PATTERN, md), 'qc_status', 5)
+
+# markdown.Markdown instances are reused (building the extension pipeline is
+# the costly part) but are not thread-safe, so each thread keeps its own
+_markdown_local = threading.local()
+
+
+def _markdown_converter() -> markdown.Markdown:
+    converter = getattr(_markdown_local, "converter", None)
+    if converter is None:
+        converter = _markdown_local.converter = markdown.Markdown(
+            extensions=['tables', 'fenced_code', 'nl2br', _StatusExtension()]
+        )
+    return converter.reset()
+
+
+# Parallel Gemini requests in generate_many (keeps bursts under rate limits)
+GEMINI_CONCURRENCY = 8
+
 
 class PDFGenerator:
     """
     Converts Markdown reports to styled PDF documents.
     """
 
+    # Parsed WeasyPrint stylesheet, shared by every instance (see _stylesheet)
+    _css_cache: Optional[tuple] = None
+
     def __init__(self, output_dir: str = "reports"):
         """
         Initialize the PDF generator.
@@ -38,35 +89,70 @@ class PDFGenerator:
         Returns:
             Path to the generated PDF file
         """
-        if HTML is None:
-            raise ImportError("weasyprint is required for PDF generation. Install it with: pip install weasyprint")
-        # Generate filename if not provided
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-            filename = f"QC_Report_{timestamp}"
+        output_path = self.output_dir / self.pdf_filename(filename)
+        output_path.write_bytes(self.markdown_to_pdf_bytes(markdown_content))
         
-        # Ensure .pdf extension
-        if not filename.endswith('.pdf'):
-            filename += '.pdf'
+        return str(output_path)
+
+    def markdown_to_pdf_bytes(self, markdown_content: str) -> bytes:
+        """
+        Convert Markdown content to PDF entirely in memory.
         
-        output_path = self.output_dir / filename
+        Args:
+            markdown_content: The Markdown text to convert
+            
+        Returns:
+            The PDF document as bytes (nothing is written to disk)
+        """
+        if HTML is None or CSS is None:
+            raise ImportError("weasyprint is required for PDF generation. Install it with: pip install weasyprint")
         
         # Convert Markdown to HTML
-        html_content = markdown.markdown(
-            markdown_content,
-            extensions=['tables', 'fenced_code', 'nl2br']
-        )
+        html_content = _markdown_converter().convert(markdown_content)
         
         # Wrap in full HTML document with styling
         full_html = self._create_styled_html(html_content)
         
-        # Generate PDF
-        if HTML is None or CSS is None:
-            raise ImportError("weasyprint is required for PDF generation")
+        # Without a target, write_pdf returns the document bytes. Fonts are
+        # subset by default (full_fonts=False); images are recompressed too
+        return HTML(string=full_html).write_pdf(
+            stylesheets=[self._stylesheet()],
+            optimize_images=True
+        )
+
+    def _stylesheet(self):
+        """
+        Return the parsed stylesheet, parsing _get_css() only when it changes.
         
-        HTML(string=full_html).write_pdf(output_path, stylesheets=[CSS(string=self._get_css())])
+        Returns:
+            weasyprint.CSS built from _get_css()
+        """
+        css_text = self._get_css()
+        cached = PDFGenerator._css_cache
+        if cached is None or cached[0] != css_text:
+            cached = PDFGenerator._css_cache = (css_text, CSS(string=css_text))
+        return cached[1]
+
+    @staticmethod
+    def pdf_filename(filename: Optional[str] = None) -> str:
+        """
+        Build the PDF file name, timestamped if no custom name is given.
         
-        return str(output_path)
+        Args:
+            filename: Optional custom filename (with or without extension)
+            
+        Returns:
+            File name ending in .pdf
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+            filename = f"QC_Report_{timestamp}"
+        
+        # Ensure .pdf extension
+        if not filename.endswith('.pdf'):
+            filename += '.pdf'
+        
+        return filename
 
     def _create_styled_html(self, body_content: str) -> str:
         """
@@ -266,17 +352,17 @@ hr {
 }
 
 /* Status badge styling */
-p:contains("CRITICAL") {
+.status-CRITICAL {
     color: #dc2626;
     font-weight: bold;
 }
 
-p:contains("WARNING") {
+.status-WARNING {
     color: #f59e0b;
     font-weight: bold;
 }
 
-p:contains("OK") {
+.status-OK {
     color: #10b981;
     font-weight: bold;
 }
@@ -303,3 +389,132 @@ p:contains("OK") {
         markdown_content = reporter.generate_report(total, fresh, dry, time_period)
         
         return self.markdown_to_pdf(markdown_content, filename)
+
+    def generate_many(self, stats_list: List[dict], max_concurrency: int = GEMINI_CONCURRENCY) -> List[str]:
+        """
+        Generate one PDF report per statistics dict, requesting the Gemini
+        reports concurrently instead of one after another.
+        
+        Runs its own event loop, so it must not be called from async code
+        (e.g. an async FastAPI endpoint): await agenerate_many there instead.
+        
+        Args:
+            stats_list: Dicts with total, fresh, dry and optionally
+                time_period and filename (as for generate_from_stats)
+            max_concurrency: Most Gemini requests in flight at once
+            
+        Returns:
+            Paths to the generated PDF files, in the order of stats_list
+        """
+        from .gemini_reporter import GeminiQCReporter
+        
+        async def generate_all():
+            # A private client whose async connections live and die with this
+            # loop; the shared client's would be bound to a closed loop next call
+            reporter = GeminiQCReporter(shared_client=False)
+            try:
+                return await _generate_reports_async(reporter, stats_list, max_concurrency)
+            finally:
+                await reporter.client.aio.aclose()
+        
+        reports = asyncio.run(generate_all())
+        return self.render_many(reports, [stats.get("filename") for stats in stats_list])
+
+    async def agenerate_many(self, stats_list: List[dict],
+                             max_concurrency: int = GEMINI_CONCURRENCY) -> List[str]:
+        """
+        Async version of generate_many for callers that own a long-lived event
+        loop (one per API worker), reusing the process-wide Gemini client.
+        
+        Returns:
+            Paths to the generated PDF files, in the order of stats_list
+        """
+        from .gemini_reporter import GeminiQCReporter
+        
+        reports = await _generate_reports_async(GeminiQCReporter(), stats_list, max_concurrency)
+        return await asyncio.to_thread(
+            self.render_many, reports, [stats.get("filename") for stats in stats_list]
+        )
+
+    def render_many(self, markdown_list: List[str], filenames: Optional[List[Optional[str]]] = None,
+                    max_workers: Optional[int] = None) -> List[str]:
+        """
+        Render several Markdown reports to PDF in parallel worker processes.
+        
+        Args:
+            markdown_list: The Markdown texts to convert
+            filenames: Optional custom filename per report (None entries get
+                numbered timestamped names)
+            max_workers: Worker processes (defaults to the number of CPUs)
+            
+        Returns:
+            Paths to the generated PDF files, in the order of markdown_list
+        """
+        if not markdown_list:
+            return []
+        if len(markdown_list) == 1:
+            return [self.markdown_to_pdf(markdown_list[0], filenames[0] if filenames else None)]
+        
+        # Default names share one timestamp, so number them to keep them distinct
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        names = [
+            (filenames[i - 1] if filenames else None) or f"QC_Report_{timestamp}_{i}"
+            for i in range(1, len(markdown_list) + 1)
+        ]
+        
+        # Layout is CPU-bound Python, so threads would serialise on the GIL.
+        # "spawn" keeps workers independent of the caller's threads/runtime
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers or os.cpu_count() or 1, len(markdown_list)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+            initargs=(str(self.output_dir),),
+        ) as pool:
+            return list(pool.map(render_pdf, markdown_list, names,
+                                 [str(self.output_dir)] * len(names)))
+
+
+async def _generate_reports_async(reporter, stats_list: List[dict], max_concurrency: int) -> List[str]:
+    """Request the reports for stats_list concurrently, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def generate(stats):
+        async with semaphore:
+            return await reporter.generate_report_async(
+                stats["total"], stats["fresh"], stats["dry"], stats.get("time_period", "")
+            )
+    
+    return await asyncio.gather(*(generate(stats) for stats in stats_list))
+
+
+def render_pdf(markdown_content: str, filename: str, output_dir: str = "reports") -> str:
+    """
+    Render a report to output_dir/filename for a background worker.
+    
+    Progress is recorded next to the PDF so any process can read it: the
+    caller's ".queued" marker is replaced by a ".part" file while rendering,
+    which is renamed to the PDF when complete (so a file at its final path is
+    always a finished report) or replaced by a ".failed" marker on error.
+    
+    Returns:
+        Path to the generated PDF file
+    """
+    generator = PDFGenerator(output_dir)
+    output_path = generator.output_dir / generator.pdf_filename(filename)
+    partial_path = output_path.with_suffix(".part")
+    partial_path.touch()
+    output_path.with_suffix(".queued").unlink(missing_ok=True)
+    try:
+        partial_path.write_bytes(generator.markdown_to_pdf_bytes(markdown_content))
+    except BaseException:
+        # Marked failed before .part goes, so the job never looks unknown
+        output_path.with_suffix(".failed").touch()
+        partial_path.unlink(missing_ok=True)
+        raise
+    os.replace(partial_path, output_path)
+    return str(output_path)
+
+
+def _init_render_worker(output_dir: str) -> None:
+    """Parse the stylesheet once per worker process, before its first report."""
+    PDFGenerator(output_dir)._stylesheet()
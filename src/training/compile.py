@@ -4,8 +4,10 @@
 """
 
 import keras
+import tensorflow as tf
 
-def create_compiled_model(input_shape=(224, 224, 3), num_classes=2, activation_function='softmax'):
+def create_compiled_model(input_shape=(224, 224, 3), num_classes=2, activation_function='softmax',
+                          mixed_precision=None, jit_compile=None):
     """
     Creates and compiles a MobileNetV2 model.
 
@@ -13,11 +15,24 @@ def create_compiled_model(input_shape=(224, 224, 3), num_classes=2, activation_f
         - input_shape: Shape of the input images.
         - num_classes: Number of output classes.
         - activation_function: The name of the activation function for the output layer
+        - mixed_precision: Build with float16 compute / float32 weights; defaults
+          to True when a GPU is visible (tensor cores), False on CPU
+        - jit_compile: XLA-compile the train step; defaults like mixed_precision,
+          since on CPU XLA adds compile time for little gain and some ops fail
 
     Returns:
         - Compiled Keras model.
     """
 
+    has_gpu = bool(tf.config.list_physical_devices('GPU'))
+    if mixed_precision is None:
+        mixed_precision = has_gpu
+    if jit_compile is None:
+        jit_compile = has_gpu
+    previous_policy = keras.mixed_precision.global_policy()
+    if mixed_precision:
+        keras.mixed_precision.set_global_policy("mixed_float16")
+
     # Load the MobileNetV2 base model (without the top layer)
     base_model = keras.applications.MobileNetV2(input_shape=input_shape, include_top=False)
 
@@ -28,14 +43,39 @@ def create_compiled_model(input_shape=(224, 224, 3), num_classes=2, activation_f
     model = keras.Sequential([
         base_model,
         keras.layers.GlobalAveragePooling2D(),
-        keras.layers.Dense(num_classes, activation=activation_function)
+        # float32 output keeps the softmax numerically stable under mixed precision
+        keras.layers.Dense(num_classes, activation=activation_function, dtype="float32")
     ])
+    # Later models (e.g. loaded for export) keep the caller's policy
+    keras.mixed_precision.set_global_policy(previous_policy)
 
     model.compile(
     optimizer='adam',
     loss='sparse_categorical_crossentropy',
-    metrics=['accuracy']
+    metrics=['accuracy'],
+    jit_compile=jit_compile
     )
 
     print("Model compiled and ready for training!")
     return model
+
+
+def to_float32(model):
+    """
+    Return a float32 copy of a model built by create_compiled_model.
+
+    Layers keep the dtype policy they were built with, so a mixed precision
+    (GPU) model would otherwise be saved, and served on CPU, with float16
+    convolutions. Trained weights are float32 variables either way and are
+    copied over unchanged; a model that is already float32 is returned as is.
+    """
+    if all(layer.dtype_policy.name == "float32" for layer in model.layers):
+        return model
+    float32_model = create_compiled_model(
+        input_shape=model.input_shape[1:],
+        num_classes=model.output_shape[-1],
+        activation_function=model.layers[-1].get_config()["activation"],
+        mixed_precision=False,
+    )
+    float32_model.set_weights(model.get_weights())
+    return float32_model
@@ -0,0 +1,123 @@
+"""Module for exporting the trained model to lighter inference formats."""
+
+import keras
+import tensorflow as tf
+
+MODEL_PATH = 'mobilenet_dates.keras'
+TFLITE_INT8_PATH = 'mobilenet_dates_int8.tflite'
+TFLITE_FP16_PATH = 'mobilenet_dates_fp16.tflite'
+ONNX_PATH = 'mobilenet_dates.onnx'
+ONNX_FP16_PATH = 'mobilenet_dates_fp16.onnx'
+CALIBRATION_BATCHES = 10
+
+def export_tflite_int8(model, representative_ds,
+                       output_path=TFLITE_INT8_PATH,
+                       calibration_batches=CALIBRATION_BATCHES):
+    """
+    Convert a Keras model to a fully int8-quantized TFLite model.
+
+    Args:
+        model: Trained Keras model
+        representative_ds: Batched (images, labels) dataset used to calibrate
+            the activation ranges (e.g. the validation split)
+        output_path: Where to write the .tflite file
+        calibration_batches: Number of batches drawn from representative_ds
+
+    Returns:
+        str: Path to the written .tflite file
+    """
+
+    def representative_dataset():
+        for images, _ in representative_ds.take(calibration_batches):
+            for image in images:
+                yield [tf.expand_dims(tf.cast(image, tf.float32), 0)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # Int8 kernels only; input/output stay float32 so callers feed raw pixels
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+    print(f"✅ Int8 TFLite model saved to {output_path}")
+    return output_path
+
+
+def export_tflite_fp16(model, output_path=TFLITE_FP16_PATH):
+    """
+    Convert a Keras model to a TFLite model with float16 weights.
+
+    Halves the weight size without calibration data; kernels still compute
+    in float32 on CPU, so this is the variant to serve on x86 hosts.
+
+    Args:
+        model: Trained Keras model
+        output_path: Where to write the .tflite file
+
+    Returns:
+        str: Path to the written .tflite file
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+    print(f"✅ FP16 TFLite model saved to {output_path}")
+    return output_path
+
+
+def export_onnx(model, output_path=ONNX_PATH):
+    """
+    Export a Keras model to ONNX for serving with ONNX Runtime.
+
+    Uses Keras' own exporter (backed by tf2onnx, `pip install tf2onnx`),
+    keeping a dynamic batch dimension.
+
+    Args:
+        model: Trained Keras model
+        output_path: Where to write the .onnx file
+
+    Returns:
+        str: Path to the written .onnx file
+    """
+    model.export(output_path, format="onnx")
+    print(f"✅ ONNX model saved to {output_path}")
+    return output_path
+
+
+def export_onnx_fp16(onnx_path=ONNX_PATH, output_path=ONNX_FP16_PATH):
+    """
+    Convert an exported ONNX model to float16 for GPU serving.
+
+    Inputs and outputs are kept float32 so the API feeds the same batches
+    to both variants. Requires `pip install onnx onnxconverter-common`.
+
+    Args:
+        onnx_path: Path to the fp32 .onnx file (see export_onnx)
+        output_path: Where to write the fp16 .onnx file
+
+    Returns:
+        str: Path to the written .onnx file
+    """
+    import onnx
+    from onnxconverter_common import float16
+
+    fp16_model = float16.convert_float_to_float16(onnx.load(onnx_path), keep_io_types=True)
+    onnx.save(fp16_model, output_path)
+    print(f"✅ FP16 ONNX model saved to {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    from training.load import load_datasets
+
+    trained_model = keras.models.load_model(MODEL_PATH)
+    _, validation = load_datasets()
+    export_tflite_int8(trained_model, validation)
+    export_tflite_fp16(trained_model)
+    export_onnx(trained_model)
+    export_onnx_fp16()
@@ -1,6 +1,8 @@
 """Module for loading and preparing training datasets."""
 
+import os
 import keras
+import tensorflow as tf
 
 TRAIN_PATH = '/content/dates_dataset_final/train'
 BATCH_SIZE = 32
@@ -8,13 +10,38 @@ IMG_HEIGHT = 224
 IMG_WIDTH = 224
 VALIDATION_SPLIT = 0.2
 SEED = 123
+# With CACHE_DIR set, decoded images are kept as a tf.data snapshot that later
+# runs reuse without decoding. Nothing is cached in RAM: training reads the
+# images once (see train.extract_features), so a per-epoch cache would only
+# hold the decoded dataset in memory for nothing
+CACHE_DIR = None
+# Batches shuffled between epochs once the file order is frozen by a cache
+SHUFFLE_BUFFER = 32
+
+
+def _cache_and_prefetch(dataset, cache_path, shuffle):
+    """Optionally snapshot decoded batches to disk, then prefetch ahead of training."""
+    prepared = dataset
+    if cache_path:
+        # A snapshot is keyed by the pipeline's fingerprint, so a changed image
+        # size or split writes a fresh one instead of reusing stale tensors
+        prepared = prepared.snapshot(cache_path)
+        if shuffle:
+            prepared = prepared.shuffle(SHUFFLE_BUFFER, seed=SEED, reshuffle_each_iteration=True)
+    prepared = prepared.prefetch(tf.data.AUTOTUNE)
+    # Keep image_dataset_from_directory's metadata (used for class weights)
+    prepared.class_names = dataset.class_names
+    prepared.file_paths = dataset.file_paths
+    return prepared
+
 
 def load_datasets(train_path=TRAIN_PATH,
                   batch_size=BATCH_SIZE,
                   img_height=IMG_HEIGHT,
                   img_width=IMG_WIDTH,
                   validation_split=VALIDATION_SPLIT,
-                  seed=SEED
+                  seed=SEED,
+                  cache_dir=CACHE_DIR
                 ):
     """
     Load training and validation datasets from directory.
@@ -26,6 +53,7 @@ def load_datasets(train_path=TRAIN_PATH,
         img_width: Image width for resizing
         validation_split: Fraction of data to use for validation
         seed: Random seed for reproducibility
+        cache_dir: Directory for on-disk dataset snapshots (None: no caching)
 
     Returns:
         tuple: (train_ds, val_ds)
@@ -49,6 +77,17 @@ def load_datasets(train_path=TRAIN_PATH,
         batch_size=batch_size
     )
 
+    # image_dataset_from_directory already decodes with parallel map calls
+    # (and reshuffles the training files every epoch)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    train_ds = _cache_and_prefetch(
+        train_ds, os.path.join(cache_dir, 'train') if cache_dir else '', shuffle=True
+    )
+    val_ds = _cache_and_prefetch(
+        val_ds, os.path.join(cache_dir, 'val') if cache_dir else '', shuffle=False
+    )
+
     return train_ds, val_ds
 
 
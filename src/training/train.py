@@ -1,36 +1,121 @@
 
 """Module for training models with class weight balancing for imbalanced datasets."""
 
+import os
+import keras
 import numpy as np
-from sklearn.utils import class_weight
-from training.compile import create_compiled_model
-
-def train_with_class_weights(train_ds, val_ds, epochs=5):
-    """Train model with balanced class weights for imbalanced datasets."""
-
-    # Calculate class weights from training data
-    train_labels = np.concatenate([y for x, y in train_ds], axis=0)
-    class_weights = class_weight.compute_class_weight(
-        class_weight='balanced',
-        classes=np.unique(train_labels),
-        y=train_labels
-    )
-    weights_dict = dict(enumerate(class_weights))
+import tensorflow as tf
+from training.compile import create_compiled_model, to_float32
+from training.export import export_tflite_int8
+from training.load import CACHE_DIR, SHUFFLE_BUFFER
+
+
+def count_classes(dataset):
+    """
+    Count samples per class from the file paths of an image_dataset_from_directory
+    dataset, without reading any images.
+    """
+    class_index = {name: i for i, name in enumerate(dataset.class_names)}
+    labels = [class_index[os.path.basename(os.path.dirname(path))] for path in dataset.file_paths]
+    return np.bincount(labels, minlength=len(class_index))
+
+
+def extract_features(backbone, feature_dim, dataset, cache_path='', shuffle=False):
+    """
+    Stream (features, label) batches of the frozen backbone over dataset for
+    training the classifier head.
+
+    The first epoch runs the backbone batch by batch (eagerly, so on the GPU
+    when there is one; a tf.data map would pin it to the CPU). Its pooled
+    features, feature_dim floats per image, are cached as they stream, in RAM
+    or in the cache_path file for large datasets, and replayed afterwards.
+    """
+    featurize = tf.function(lambda images: tf.cast(backbone(images, training=False), tf.float32))
+
+    def batches():
+        for images, labels in dataset:
+            yield featurize(images), labels
+
+    feature_ds = tf.data.Dataset.from_generator(
+        batches,
+        output_signature=(
+            tf.TensorSpec([None, feature_dim], tf.float32),
+            dataset.element_spec[1],
+        ),
+    ).cache(cache_path)
+    if shuffle:
+        feature_ds = feature_ds.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    return feature_ds.prefetch(tf.data.AUTOTUNE)
+
+
+def train_with_class_weights(train_ds, val_ds, epochs=30, export_int8=True, cache_dir=CACHE_DIR):
+    """
+    Train model with balanced class weights for imbalanced datasets.
+
+    `epochs` is an upper bound: training stops once val_loss stops improving
+    and the best epoch's weights are kept. With `export_int8`, an int8 TFLite
+    model calibrated on val_ds is written next to the .keras file. Backbone
+    features are cached in RAM, or under `cache_dir` when it is set.
+
+    Returns:
+        tuple: (full float32 model, History of the head fit). Only the Dense head is
+        fitted on precomputed features, so the history's loss/accuracy are the
+        head's, which equal the full model's since the backbone is frozen
+    """
+
+    # Calculate 'balanced' class weights (n_samples / (n_classes * count))
+    # from the directory listing instead of a full pass over the images
+    counts = count_classes(train_ds)
+    present = np.flatnonzero(counts)
+    weights_dict = {
+        int(i): float(counts.sum() / (len(present) * counts[i])) for i in present
+    }
     print(f"⚖️ Calculated Class Weights: {weights_dict}")
     print("(The model will pay more attention to class with higher weight)")
 
     model = create_compiled_model()
 
-    history = model.fit(
-        train_ds,
-        validation_data=val_ds,
+    # The backbone is frozen, so its (pooled) features never change between
+    # epochs: compute them once and fit only the Dense head, which shares its
+    # weights with the full model that gets saved
+    backbone = keras.Sequential(model.layers[:-1])
+    head = keras.Sequential([model.layers[-1]])
+    head.compile_from_config(model.get_compile_config())
+    # Pooling keeps the channels of the base model's last feature map
+    feature_dim = model.layers[0].output.shape[-1]
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    train_features = extract_features(
+        backbone, feature_dim, train_ds,
+        os.path.join(cache_dir, 'train_features') if cache_dir else '', shuffle=True
+    )
+    val_features = extract_features(
+        backbone, feature_dim, val_ds,
+        os.path.join(cache_dir, 'val_features') if cache_dir else ''
+    )
+
+    history = head.fit(
+        train_features,
+        validation_data=val_features,
         epochs=epochs,
-        class_weight=weights_dict
+        class_weight=weights_dict,
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor='val_loss', patience=2, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=1)
+        ]
     )
     print("✅ Model training complete!")
 
+    # Mixed precision only speeds up the feature pass; the saved and exported
+    # model is float32 so CPU serving never runs float16 convolutions
+    model = to_float32(model)
+
     # Save the model to the Colab disk
     model.save('mobilenet_dates.keras')
     print("✅ Model saved successfully!")
 
+    if export_int8:
+        export_tflite_int8(model, val_ds)
+
     return model, history
@@ -0,0 +1,46 @@
+"""
+Tests for the dashboard's data shaping helpers.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+# The dashboard runs from src/ and imports its siblings as top-level packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import dashboard  # noqa: E402
+
+
+def test_pivot_hourly_counts_folds_case_and_drops_unknown_labels():
+    h1 = pd.Timestamp("2026-02-14T01:00:00", tz="UTC")
+    h2 = pd.Timestamp("2026-02-14T02:00:00", tz="UTC")
+    rows = pd.DataFrame({
+        "hour": [h1, h1, h1, h1, h2],
+        "prediction": ["Fresh", "FRESH", "Rotten", "unknown", "dry"],
+        "count": [1, 2, 5, 7, 3],
+    })
+
+    result = dashboard._pivot_hourly_counts(rows)
+
+    assert list(result.columns) == ["Fresh", "Dry"]
+    assert result.loc[h1, "Fresh"] == 3
+    assert result.loc[h1, "Dry"] == 0
+    assert result.loc[h2, "Fresh"] == 0
+    assert result.loc[h2, "Dry"] == 3
+
+
+def test_pivot_hourly_counts_with_only_unknown_labels_is_empty():
+    rows = pd.DataFrame({
+        "hour": [pd.Timestamp("2026-02-14T01:00:00", tz="UTC")] * 2,
+        "prediction": ["Rotten", "other"],
+        "count": [4, 1],
+    })
+
+    result = dashboard._pivot_hourly_counts(rows)
+
+    assert result.empty
+    assert list(result.columns) == ["Fresh", "Dry"]
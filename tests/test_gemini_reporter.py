@@ -0,0 +1,32 @@
+"""
+Tests for the Gemini QC reporter helpers (no network calls).
+"""
+
+import pytest
+
+pytest.importorskip("google.genai")
+pytest.importorskip("pydantic")
+
+from src.reporting.gemini_reporter import ReportItem, _parse_report_items  # noqa: E402
+
+
+def test_parse_report_items_reads_json_text():
+    text = '[{"batch": 0, "markdown": " ## A "}, {"batch": 1, "markdown": "## B"}]'
+
+    assert _parse_report_items(None, text) == {0: "## A", 1: "## B"}
+
+
+def test_parse_report_items_prefers_parsed_items():
+    parsed = [ReportItem(batch=2, markdown="## C")]
+
+    assert _parse_report_items(parsed, "not json") == {2: "## C"}
+
+
+def test_parse_report_items_survives_truncated_json():
+    assert _parse_report_items(None, '[{"batch": 0, "markdown": "## A') == {}
+
+
+def test_parse_report_items_skips_invalid_items():
+    text = '[{"batch": 0}, "oops", {"batch": "x", "markdown": "## X"}, {"batch": 1, "markdown": "## B"}]'
+
+    assert _parse_report_items(None, text) == {1: "## B"}
@@ -0,0 +1,86 @@
+"""
+Tests for the Markdown -> HTML step of the PDF generator.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("markdown")
+
+from src.reporting.pdf_generator import PDFGenerator, _markdown_converter  # noqa: E402
+
+
+def test_status_keyword_in_text_is_wrapped():
+    html = _markdown_converter().convert("Status: **CRITICAL** and WARNING")
+
+    assert '<span class="status-CRITICAL">CRITICAL</span>' in html
+    assert '<span class="status-WARNING">WARNING</span>' in html
+
+
+def test_status_keyword_in_attributes_and_code_is_untouched():
+    html = _markdown_converter().convert(
+        "![OK](ok.png \"OK\") [link](https://example.com/OK) `OK`\n\n"
+        "```\nOK\n```"
+    )
+
+    assert 'alt="OK"' in html
+    assert 'title="OK"' in html
+    assert 'href="https://example.com/OK"' in html
+    assert "<code>OK</code>" in html
+    assert "<code>OK\n</code>" in html
+    assert "status-OK" not in html
+
+
+def test_status_keyword_in_link_text_is_wrapped():
+    html = _markdown_converter().convert("[OK](https://example.com/OK)")
+
+    assert '<a href="https://example.com/OK"><span class="status-OK">OK</span></a>' in html
+
+
+class _FakeAsyncModels:
+    def __init__(self, aio):
+        self._aio = aio
+
+    async def generate_content(self, model, contents, config):
+        # Pooled async connections only work on the loop that opened them
+        loop = asyncio.get_running_loop()
+        assert not self._aio.closed
+        if self._aio.loop is None:
+            self._aio.loop = loop
+        assert self._aio.loop is loop, "client reused across event loops"
+        return SimpleNamespace(text="## Report")
+
+
+class _FakeAio:
+    def __init__(self):
+        self.loop = None
+        self.closed = False
+        self.models = _FakeAsyncModels(self)
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _FakeClient:
+    def __init__(self, api_key):
+        self.aio = _FakeAio()
+
+
+def test_generate_many_can_be_called_twice(monkeypatch, tmp_path):
+    pytest.importorskip("google.genai")
+    from src.reporting import gemini_reporter
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_reporter, "genai", SimpleNamespace(Client=_FakeClient))
+    monkeypatch.setattr(gemini_reporter, "_get_disk_cache", lambda: None)
+    monkeypatch.setattr(PDFGenerator, "render_many", lambda self, reports, filenames: reports)
+    generator = PDFGenerator(str(tmp_path))
+
+    first = generator.generate_many([{"total": 101, "fresh": 100, "dry": 1}])
+    second = generator.generate_many([{"total": 102, "fresh": 100, "dry": 2},
+                                      {"total": 103, "fresh": 100, "dry": 3}])
+
+    assert first == ["## Report"]
+    assert second == ["## Report", "## Report"]